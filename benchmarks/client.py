@@ -0,0 +1,195 @@
+"""
+Client throughput and latency benchmark.
+
+Runs the client against the local stand-in API (``socialcontext.standin``)
+and, if moto is installed, an in-process S3 mock, and reports:
+
+- single (sequential) classify throughput and p50/p99 latency
+- bulk ``classify_many`` throughput and p50/p99 latency
+- re-authentication overhead, proactive refresh and after a 401
+- download throughput in MB/s
+
+    python benchmarks/client.py [--requests N] [--workers N] [--latency S]
+        [--json results.json] [--baseline baseline.json --tolerance 0.25]
+
+With ``--baseline``, exits with status 1 if any metric regressed by more than
+``--tolerance`` relative to the baseline results, so it can gate CI.
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Metrics where a larger value is better; all others are timings.
+HIGHER_IS_BETTER = ("single_rps", "bulk_rps", "download_mbps")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def make_client(server_url):
+    os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
+    from socialcontext.api import SocialcontextClient
+
+    class TimedClient(SocialcontextClient):
+        """Records the wall-clock time of every classify call."""
+
+        timings = []
+
+        def classify(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().classify(*args, **kwargs)
+            finally:
+                self.timings.append(time.perf_counter() - start)
+
+    secret = base64.urlsafe_b64encode(os.urandom(32)).decode()
+    return TimedClient("benchmark", secret, api_root=server_url)
+
+
+def bench_single(client, n):
+    client.timings = []
+    start = time.perf_counter()
+    for i in range(n):
+        client.classify("news", ["political"], url=f"https://example.com/single/{i}")
+    elapsed = time.perf_counter() - start
+    return {
+        "single_rps": n / elapsed,
+        "single_p50_ms": percentile(client.timings, 50) * 1000,
+        "single_p99_ms": percentile(client.timings, 99) * 1000,
+    }
+
+
+def bench_bulk(client, n, workers):
+    client.timings = []
+    urls = [f"https://example.com/bulk/{i}" for i in range(n)]
+    start = time.perf_counter()
+    errors = sum(
+        1 for r in client.classify_many(urls, ["political"], max_workers=workers)
+        if r.error is not None
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        "bulk_rps": n / elapsed,
+        "bulk_p50_ms": percentile(client.timings, 50) * 1000,
+        "bulk_p99_ms": percentile(client.timings, 99) * 1000,
+        "bulk_errors": errors,
+    }
+
+
+def bench_reauth(client, server, n):
+    refreshes = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.tokens.refresh(stale=client.tokens.get())
+        refreshes.append(time.perf_counter() - start)
+    rejected = []
+    for i in range(n):
+        server.revoke_tokens()
+        start = time.perf_counter()
+        client.classify("news", ["political"], url=f"https://example.com/reauth/{i}")
+        rejected.append(time.perf_counter() - start)
+    return {
+        "refresh_ms": statistics.median(refreshes) * 1000,
+        "reauth_classify_ms": statistics.median(rejected) * 1000,
+    }
+
+
+def bench_download(parts, part_mb, workers):
+    try:
+        import moto
+    except ImportError:
+        print("moto is not installed; skipping the download benchmark", file=sys.stderr)
+        return {}
+    mock = getattr(moto, "mock_aws", None) or getattr(moto, "mock_s3")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    from socialcontext import s3
+
+    line = b"https://example.com/some/article/path,example.com,0.12345,0.67890\n"
+    body = b"url,domain,political,vice\n" + line * (part_mb * 1024 * 1024 // len(line))
+    data = gzip.compress(body, compresslevel=1)
+    with mock():
+        s3._s3_resource = None
+        client = s3.s3_client()
+        client.create_bucket(Bucket="benchmark")
+        for i in range(parts):
+            client.put_object(Bucket="benchmark", Key=f"out/data-{i:05}.csv.gz", Body=data)
+        listed = s3.list_parts("benchmark", "out", "data")
+        with open(os.devnull, "wb") as sink:
+            start = time.perf_counter()
+            written = s3.write_parts(s3.stream_parts("benchmark", listed, workers=workers), sink)
+            elapsed = time.perf_counter() - start
+        s3._s3_resource = None
+    return {"download_mbps": written / elapsed / 1e6}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old or name == "bulk_errors":
+            continue
+        if name in HIGHER_IS_BETTER:
+            regressed = value < old * (1 - tolerance)
+        else:
+            regressed = value > old * (1 + tolerance)
+        if regressed:
+            regressions.append(f"{name}: {old:.2f} -> {value:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stand-in API latency in seconds.")
+    parser.add_argument("--reauth-runs", type=int, default=20)
+    parser.add_argument("--parts", type=int, default=8)
+    parser.add_argument("--part-mb", type=int, default=8)
+    parser.add_argument("--json", dest="json_file", help="Write results to this file.")
+    parser.add_argument("--baseline", help="Results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    cache = tempfile.TemporaryDirectory()
+    os.environ["SOCIALCONTEXT_CACHE_DIR"] = cache.name
+    from socialcontext.standin import StandinServer
+
+    results = {}
+    with StandinServer(latency=args.latency) as server:
+        client = make_client(server.url)
+        results.update(bench_single(client, args.requests))
+        results.update(bench_bulk(client, args.requests, args.workers))
+        results.update(bench_reauth(client, server, args.reauth_runs))
+        client.tokens.clear()
+    results.update(bench_download(args.parts, args.part_mb, args.workers))
+    cache.cleanup()
+
+    for name, value in results.items():
+        print(f"{name:<24} {value:10.2f}")
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+CLI startup time benchmark.
+
+Runs ``socialcontext version`` and ``socialcontext --help`` repeatedly in
+fresh interpreters and reports the median and worst wall-clock times, and
+lists which socialcontext modules and heavy dependencies were imported.
+
+    python benchmarks/startup.py [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = [["version"], ["--help"], ["jobs", "--help"]]
+
+HEAVY_MODULES = ["requests", "oauthlib", "requests_oauthlib", "cryptography", "boto3"]
+
+# Prefixes the module list, so it is not confused with the command's output.
+MARKER = "imported: "
+
+CHECK_IMPORTS = (
+    "import sys; sys.argv = ['socialcontext', 'version']\n"
+    "from socialcontext import cli\n"
+    "try:\n    cli.run()\nexcept SystemExit:\n    pass\n"
+    "print({marker!r} + ','.join(m for m in {heavy!r} if m in sys.modules), file=sys.stderr)"
+)
+
+
+def time_command(args, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "socialcontext", *args],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    baseline = (time.perf_counter() - start) * 1000
+    print(f"{'python -c pass':<32} {baseline:8.1f} ms")
+    for command in COMMANDS:
+        timings = time_command(command, args.runs)
+        label = "socialcontext " + " ".join(command)
+        print(
+            f"{label:<32} {statistics.median(timings):8.1f} ms median "
+            f"{max(timings):8.1f} ms max"
+        )
+
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_IMPORTS.format(heavy=HEAVY_MODULES, marker=MARKER)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = next(
+        (line[len(MARKER):] for line in result.stderr.splitlines() if line.startswith(MARKER)),
+        "",
+    )
+    print(f"heavy modules imported by 'version': {imported or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,19 +17,17 @@ MODELS = [
 
 count = 0
 with open('example_urls.txt') as f:
-    for url in f:
-        url = url.strip()
-        if not url:
+    urls = (line.strip() for line in f if line.strip())
+    for result in client.classify_many(urls, models=MODELS, max_workers=8):
+        count += 1
+        if result.error is not None:
+            print(f'Failed: {result.item}: {result.error}')
             continue
-        print(f'Fetching: {url}')
-        resp = client.news.classify(url=url, models=MODELS)
-        print(resp.status_code)
-        data = resp.json()
+        data = result.data
         print('Classifications:', data['classifications'])
         if any([cls > 0.5 for cls in
                 data['classifications'].values() ]):
             bad_articles.append(data['source']['url'])
-        count += 1
 
 rate = len(bad_articles) / count
 print(f'{len(bad_articles)} of {count} articles blocked for brand safety. Blockage rate: {rate:.2}')
@@ -89,8 +89,12 @@ setup(
         'typer>=0.3.2',
     ],
     extras_require={
-        'test': ['pytest'],
-        'aws': ['boto3>=1.17.71']
+        'test': ['pytest', 'moto>=2.0'],
+        'aws': ['boto3>=1.17.71'],
+        'async': ['httpx>=0.18.1'],
+        'arrow': ['pyarrow>=4.0.0'],
+        'zstd': ['zstandard>=0.15.2'],
+        'analyze': ['numpy>=1.20'],
     },
     tests_require=['socialcontext[test]'],
 )
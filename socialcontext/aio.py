@@ -0,0 +1,234 @@
+"""
+Asyncio client for the socialcontext.ai API.
+
+Mirrors the endpoint surface of :class:`socialcontext.api.SocialcontextClient`
+on top of a single pooled ``httpx.AsyncClient`` so that many requests can be
+in flight from one event loop. Requires the ``async`` extra:
+
+    pip install socialcontext[async]
+"""
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Optional, Union
+
+from .api import (
+    DEFAULT_BATCH_SIZE,
+    VERSION,
+    InvalidRequest,
+    SocialcontextClient,
+)
+
+logger = logging.getLogger("socialcontext")
+
+DEFAULT_CONCURRENCY = 100
+
+
+class AsyncSocialcontextClient:
+    """Async counterpart to SocialcontextClient.
+
+    Use as an async context manager so the underlying connection pool is
+    closed when done:
+
+        async with AsyncSocialcontextClient(app_id, app_secret) as client:
+            r = await client.classify("news", models=["vice"], url=url)
+    """
+
+    API_ROOT = SocialcontextClient.API_ROOT
+    TOKEN_URL = SocialcontextClient.TOKEN_URL
+
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        *,
+        max_connections: int = DEFAULT_CONCURRENCY,
+        timeout: float = 30.0,
+        api_root: str = None,
+    ):
+        import httpx
+
+        self.app_id = app_id
+        self.app_secret = app_secret
+        if api_root is not None:
+            self.API_ROOT = api_root.rstrip("/")
+            self.TOKEN_URL = f"{self.API_ROOT}/{VERSION}/token"
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+        self.token = None
+        self._token_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    def prefix(self, version: str) -> str:
+        return f"{self.API_ROOT}/{version}"
+
+    # Authentication
+
+    async def fetch_api_token(self) -> dict:
+        """Fetch a client-credentials token, as OAuth2Session.fetch_token does."""
+        resp = await self.http.post(
+            self.TOKEN_URL,
+            data={
+                "grant_type": "client_credentials",
+                "client_id": self.app_id,
+                "client_secret": self.app_secret,
+            },
+            headers={"Accept": "application/json"},
+        )
+        token = resp.json() if resp.content else {}
+        if "access_token" not in token:
+            print("Something went wrong, please check your client credentials.")
+            raise InvalidRequest(f"Token request failed: {resp.status_code}")
+        if "expires_in" in token:
+            token["expires_at"] = time.time() + int(token["expires_in"])
+        return token
+
+    async def ensure_token(self, stale: Optional[dict] = None) -> dict:
+        """Return the current token, fetching one if needed.
+
+        Concurrent callers share a single fetch. If ``stale`` is given it is the
+        token a caller saw rejected; a new token is only fetched if no other
+        caller has already replaced it.
+        """
+        if self.token is not None and self.token is not stale:
+            return self.token
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if self.token is None or self.token is stale:
+                self.token = await self.fetch_api_token()
+        return self.token
+
+    # Requests
+
+    async def dispatch(
+        self, _method: str, _url: str, data: dict = None, **query
+    ):
+        logger.debug(f"Fetching URL {_url}; method: {_method}")
+        if _method not in ("get", "post", "put", "delete"):
+            raise Exception("Unsupported dispatch method")
+        token = await self.ensure_token()
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            kwargs = {"headers": headers}
+            if query:
+                kwargs["params"] = query
+            if data is not None:
+                kwargs["json"] = data
+            resp = await self.http.request(_method.upper(), _url, **kwargs)
+            if resp.status_code not in [401, 403] or attempt:
+                return resp
+            token = await self.ensure_token(stale=token)
+        return resp
+
+    async def pathget(self, path: str, version: str = VERSION, **query):
+        return await self.dispatch("get", f"{self.prefix(version)}/{path}", **query)
+
+    async def pathpost(self, path: str, version: str = VERSION, data: dict = None):
+        return await self.dispatch("post", f"{self.prefix(version)}/{path}", data=data)
+
+    async def pathput(self, path: str, version: str = VERSION, data: dict = None):
+        return await self.dispatch("put", f"{self.prefix(version)}/{path}", data=data)
+
+    async def pathdelete(self, path: str, version: str = VERSION):
+        return await self.dispatch("delete", f"{self.prefix(version)}/{path}")
+
+    # API endpoints
+
+    async def create_job(
+        self,
+        *,
+        content_type: str = "news",
+        input_file: str = None,
+        output_path: str = None,
+        models: List[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        options: List[str] = None,
+        version: str = VERSION,
+    ):
+        """Create a batch processing job."""
+        if input_file is None:
+            raise Exception("Input file required.")
+        return await self.pathpost(
+            "jobs",
+            version,
+            data={
+                "content_type": content_type,
+                "input_file": input_file,
+                "output_path": output_path,
+                "batch_size": batch_size,
+                "options": options or [],
+                "models": models or [],
+            },
+        )
+
+    async def update_job(self, job_id: str, *, version: str = VERSION, **data):
+        """Update a pre-defined job."""
+        return await self.pathput(f"jobs/{job_id}", version, data=data)
+
+    async def delete_job(self, job_id: str, *, version: str = VERSION):
+        """Delete a job."""
+        return await self.pathdelete(f"jobs/{job_id}", version)
+
+    async def jobs(self, *, job_id: str = None, version: str = VERSION):
+        """List jobs or show details of a specified job."""
+        if job_id:
+            return await self.pathget(f"jobs/{job_id}", version)
+        return await self.pathget("jobs", version)
+
+    async def models(self):
+        """List supported inference models."""
+        return await self.pathget("models")
+
+    async def classify(self, content_type, models=None, url=None, text=None):
+        """Classify a url for the given models."""
+        if url:
+            return await self.pathpost("classify", data={"url": url, "models": models})
+        elif text:
+            return await self.pathpost("classify", data={"text": text, "models": models})
+        else:
+            raise InvalidRequest("Either url or text must be provided.")
+
+    async def classify_many(
+        self,
+        urls: Iterable[str],
+        models: List[str] = None,
+        *,
+        content_type: str = "news",
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> List[Union[dict, Exception]]:
+        """Classify many URLs with at most ``concurrency`` requests in flight.
+
+        Returns a list aligned with the input. Each entry is the decoded
+        classification response, or the exception raised for that URL so one
+        failure does not abort the batch.
+        """
+        results = {}
+        source = iter(enumerate(urls))
+
+        async def worker():
+            # Workers pull lazily from the shared iterator, so only
+            # ``concurrency`` coroutines exist regardless of input size.
+            for i, url in source:
+                try:
+                    r = await self.classify(content_type, models=models, url=url)
+                    r.raise_for_status()
+                    results[i] = r.json()
+                except Exception as e:
+                    results[i] = e
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return [results[i] for i in range(len(results))]
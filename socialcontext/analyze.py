@@ -0,0 +1,253 @@
+"""
+Local analytics over batch job output.
+
+Output CSV rows are parsed a chunk at a time into NumPy score matrices (one
+row per URL, one column per model) and folded into running totals, so
+memory use is bounded by the chunk size however large the output is. One
+pass computes, for any number of thresholds, block rates and model
+co-occurrence counts, along with per-model score histograms and quantiles.
+Requires the ``analyze`` extra:
+
+    pip install socialcontext[analyze]
+"""
+import csv
+import io
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from .constants import DEFAULT_BINS, DEFAULT_CHUNK_ROWS
+
+DEFAULT_THRESHOLDS = (0.5,)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+# Scores are binned this finely to estimate quantiles without keeping them.
+QUANTILE_RESOLUTION = 10000
+
+NON_SCORE_COLUMNS = frozenset(["url", "domain"])
+
+
+class ScoreAnalyzer:
+    """Running statistics over score matrices.
+
+    Scores are expected in [0, 1]; values outside are clipped into the end
+    bins of the histograms. Missing scores (NaN) never count as blocked and
+    are left out of histograms and quantiles. A URL is blocked at a
+    threshold if any of its scores is at or above it.
+    """
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+        *,
+        bins: int = DEFAULT_BINS,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    ):
+        self.models = list(models)
+        self.thresholds = np.asarray(sorted(thresholds), dtype=np.float64)
+        self.bins = bins
+        self.quantiles = list(quantiles)
+        m, t = len(self.models), len(self.thresholds)
+        self.rows = 0
+        self.missing = np.zeros(m, dtype=np.int64)
+        self.blocked = np.zeros(t, dtype=np.int64)
+        self.co_occurrence = np.zeros((t, m, m), dtype=np.int64)
+        self.histogram = np.zeros((m, bins), dtype=np.int64)
+        self.fine = np.zeros((m, QUANTILE_RESOLUTION), dtype=np.int64)
+
+    def _bin(self, scores, counts, nbins):
+        m = len(self.models)
+        valid = ~np.isnan(scores)
+        index = np.clip((np.nan_to_num(scores) * nbins).astype(np.int64), 0, nbins - 1)
+        index += np.arange(m, dtype=np.int64) * nbins
+        counts += np.bincount(index[valid], minlength=m * nbins).reshape(m, nbins)
+
+    def update(self, scores: np.ndarray) -> None:
+        """Fold an ``(urls, models)`` matrix of scores into the statistics."""
+        if not len(scores):
+            return
+        self.rows += len(scores)
+        self.missing += np.isnan(scores).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            for i, threshold in enumerate(self.thresholds):
+                flags = (scores >= threshold).astype(np.int32)
+                self.blocked[i] += int(flags.any(axis=1).sum())
+                self.co_occurrence[i] += flags.T @ flags
+        self._bin(scores, self.histogram, self.bins)
+        self._bin(scores, self.fine, QUANTILE_RESOLUTION)
+
+    def quantile(self, model: int, q: float):
+        counts = self.fine[model]
+        total = counts.sum()
+        if not total:
+            return None
+        position = int(np.searchsorted(np.cumsum(counts), q * total))
+        return min(position + 0.5, QUANTILE_RESOLUTION) / QUANTILE_RESOLUTION
+
+    def result(self) -> dict:
+        edges = np.linspace(0.0, 1.0, self.bins + 1).round(6).tolist()
+        thresholds = {}
+        for i, threshold in enumerate(self.thresholds):
+            co = self.co_occurrence[i]
+            block_rate = float(self.blocked[i] / self.rows) if self.rows else 0.0
+            thresholds[str(float(threshold))] = {
+                "blocked": int(self.blocked[i]),
+                "block_rate": block_rate,
+                "recovery_rate": 1.0 - block_rate if self.rows else 0.0,
+                "models": {
+                    model: {
+                        "blocked": int(co[j, j]),
+                        "block_rate": float(co[j, j] / self.rows) if self.rows else 0.0,
+                    }
+                    for j, model in enumerate(self.models)
+                },
+                "co_occurrence": {
+                    model: dict(zip(self.models, co[j].tolist()))
+                    for j, model in enumerate(self.models)
+                },
+            }
+        return {
+            "rows": self.rows,
+            "models": self.models,
+            "missing": dict(zip(self.models, self.missing.tolist())),
+            "thresholds": thresholds,
+            "histograms": {
+                model: {"edges": edges, "counts": self.histogram[j].tolist()}
+                for j, model in enumerate(self.models)
+            },
+            "quantiles": {
+                model: {str(q): self.quantile(j, q) for q in self.quantiles}
+                for j, model in enumerate(self.models)
+            },
+        }
+
+
+def score_chunks(
+    lines: Iterable[str],
+    models: Sequence[str] = None,
+    *,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[np.ndarray]:
+    """Parse one CSV part, header first, into score matrices of ``chunk_rows`` rows.
+
+    Columns are those named in ``models``, in that order; a model missing
+    from the part's header gives NaN scores. Without ``models``, every column
+    but the url and domain is used.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    if models is None:
+        models = [name for name in header if name not in NON_SCORE_COLUMNS]
+    positions = {name: i for i, name in enumerate(header)}
+    columns = [positions.get(model) for model in models]
+    nan = float("nan")
+
+    def parse(value):
+        try:
+            return float(value)
+        except ValueError:
+            return nan
+
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield _matrix(chunk, columns, parse)
+            chunk = []
+    if chunk:
+        yield _matrix(chunk, columns, parse)
+
+
+def _matrix(rows, columns, parse):
+    nan = float("nan")
+    values = (
+        parse(row[c]) if c is not None and c < len(row) else nan
+        for row in rows
+        for c in columns
+    )
+    return np.fromiter(values, dtype=np.float64, count=len(rows) * len(columns)).reshape(
+        len(rows), len(columns)
+    )
+
+
+def analyze_parts(
+    parts: Iterable[Iterable[str]],
+    thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+    models: Sequence[str] = None,
+    *,
+    bins: int = DEFAULT_BINS,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> dict:
+    """Analyze output parts, each an iterable of CSV lines starting with a header.
+
+    Without ``models``, the score columns of the first part are analyzed.
+    Returns ``ScoreAnalyzer.result()``.
+    """
+    analyzer = None
+    for lines in parts:
+        lines = iter(lines)
+        if analyzer is None:
+            first = next(lines, None)
+            if first is None:
+                continue
+            if models is None:
+                header = next(csv.reader([first]))
+                models = [name for name in header if name not in NON_SCORE_COLUMNS]
+            analyzer = ScoreAnalyzer(models, thresholds, bins=bins, quantiles=quantiles)
+            lines = _prepend(first, lines)
+        for scores in score_chunks(lines, models, chunk_rows=chunk_rows):
+            analyzer.update(scores)
+    if analyzer is None:
+        analyzer = ScoreAnalyzer(models or [], thresholds, bins=bins, quantiles=quantiles)
+    return analyzer.result()
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def local_parts(paths: Iterable[Union[str, Path]]) -> Iterator[Iterator[str]]:
+    """Yield the lines of each local output file, decompressing by suffix."""
+    from .s3 import open_decompressed
+
+    for path in paths:
+        with open(path, "rb") as raw:
+            yield io.TextIOWrapper(open_decompressed(str(path), raw), encoding="utf-8", newline="")
+
+
+def s3_parts(bucket: str, prefix: str, **kwargs) -> Iterator[Iterator[str]]:
+    """Yield the lines of each ``data-*`` output part under an S3 prefix.
+
+    Keyword arguments are passed to ``prefetch_parts``.
+    """
+    from .s3 import list_parts, prefetch_parts
+
+    parts = list_parts(bucket, prefix, "data")
+    for part, data in prefetch_parts(bucket, parts, **kwargs):
+        yield io.StringIO(data.decode("utf-8"), newline="")
+
+
+def summary_records(result: dict) -> List[Dict]:
+    """Flatten an analysis result into one record per threshold and model."""
+    records = []
+    for threshold, stats in result["thresholds"].items():
+        for model in result["models"]:
+            record = {
+                "threshold": float(threshold),
+                "model": model,
+                "blocked": stats["models"][model]["blocked"],
+                "block_rate": stats["models"][model]["block_rate"],
+                "any_block_rate": stats["block_rate"],
+                "recovery_rate": stats["recovery_rate"],
+                "missing": result["missing"][model],
+            }
+            for q, value in result["quantiles"][model].items():
+                record[f"p{float(q) * 100:g}"] = value
+            records.append(record)
+    return records
@@ -1,25 +1,33 @@
-import base64
-import dbm
+import gzip
 import json
 import logging
 import urllib
-import oauthlib
-import os
 import sys
+import threading
+import time
 import requests
 import urllib.parse
-from typing import List, Optional, Union
-from pathlib import Path
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 from cryptography.fernet import Fernet
 from oauthlib.oauth2 import BackendApplicationClient
 from oauthlib.oauth2.rfc6749.errors import MissingTokenError
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
 from requests_oauthlib import OAuth2Session
-
-VERSION = "v1"
-
-DEFAULT_BATCH_SIZE = 1000
-MIN_BATCH_SIZE = 500
-MAX_BATCH_SIZE = 5000
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from .cache import ResultCache, content_key
+from .retry import RateLimiter, RetryPolicy
+from .tokens import TokenManager, make_fernet
+from .registry import ModelRegistry, get_registry
+from .metrics import Hook, RequestEvent, call_hooks
+from .text import preprocess_text
+from .constants import API_ROOT, DEFAULT_BATCH_SIZE, VERSION
+# Defined here before constants existed; kept importable from api.
+from .constants import MAX_BATCH_SIZE, MIN_BATCH_SIZE  # noqa: F401
 
 logger = logging.getLogger("socialcontext")
 logger.addHandler(logging.StreamHandler(sys.stdout))
@@ -38,28 +46,201 @@ class MissingToken(Exception):
     ...
 
 
-KEY_DB = Path(__file__).parent / ".key"
+
+DEFAULT_MAX_WORKERS = 8
+
+DISPATCH_METHODS = ("get", "post", "put", "delete")
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_TIMEOUT = (10.0, 60.0)
+DEFAULT_PAGE_SIZE = 100
+
+COMPRESSION_METHODS = ("gzip", "deflate")
+# Request bodies smaller than this are not worth compressing.
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+
+
+class ClassifyResult(NamedTuple):
+    """Outcome of one item in a bulk classification.
+
+    ``index`` is the item's position in the input. Exactly one of ``data``
+    (the decoded response) or ``error`` (the raised exception) is set.
+    """
+
+    index: int
+    item: Any
+    data: Optional[dict] = None
+    error: Optional[Exception] = None
+
+
+def json_response(
+    data: dict, *, status_code: int = 200, url: str = None, bytes_saved: int = 0
+) -> requests.Response:
+    """Build a Response carrying ``data`` for results served locally."""
+    resp = requests.Response()
+    resp.bytes_saved = bytes_saved
+    resp.status_code = status_code
+    resp.url = url
+    resp.headers["Content-Type"] = "application/json"
+    resp.encoding = "utf-8"
+    resp._content = json.dumps(data).encode("utf-8")
+    return resp
+
+
+class BearerAuth(AuthBase):
+    """Attach a specific token to a request.
+
+    Each request carries the token it was sent with, so replacing the
+    client's token never affects requests already in flight.
+    """
+
+    def __init__(self, token: dict):
+        self.token = token
+
+    def __call__(self, r):
+        r.headers["Authorization"] = f"Bearer {self.token['access_token']}"
+        return r
+
+
+# Seconds spent opening connections by the current thread's request.
+_connect_time = threading.local()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, "value", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.value = getattr(_connect_time, "value", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long they took to open.
+
+    Name resolution happens inside the socket connect, so it is included in
+    the connect time rather than reported separately.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
 
 
 class SocialcontextClient:
+    """Client for the socialcontext.ai API.
+
+    A client is safe to share between threads. All requests go through one
+    ``requests.Session`` whose connection pool holds up to ``pool_maxsize``
+    connections per host; with ``pool_block`` threads wait for a free
+    connection instead of opening extra, unpooled ones. Re-authentication
+    only replaces the token held by the client's TokenManager, never the
+    session. ``timeout`` is a ``(connect, read)`` pair of seconds, or a single
+    value for both.
+
+    Each of ``hooks`` is called with a RequestEvent after every dispatched
+    request; see ``socialcontext.metrics``.
+
+    With ``compress`` set to ``"gzip"`` or ``"deflate"``, request bodies of at
+    least ``compress_min_size`` bytes are sent compressed. With ``preprocess``,
+    text to classify is stripped of markup, whitespace-normalized and
+    truncated to the models' maximum input length before it is sent.
+
+    ``api_root`` overrides the ``SOCIALCONTEXT_API_ROOT`` environment
+    variable, read when ``socialcontext`` is first imported, for this client.
+    """
 
-    API_ROOT = os.environ.get("SOCIALCONTEXT_API_ROOT", "https://api.socialcontext.ai")
+    API_ROOT = API_ROOT
     TOKEN_URL = f"{API_ROOT}/{VERSION}/token"
     REFRESH_URL = f"{API_ROOT}/{VERSION}/token-refresh"
 
-    def __init__(self, app_id: str, app_secret: str):
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        *,
+        cache: ResultCache = None,
+        retry: RetryPolicy = None,
+        limiter: RateLimiter = None,
+        validate_models: bool = True,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+        timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+        hooks: Iterable[Hook] = (),
+        compress: Optional[str] = None,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+        preprocess: bool = False,
+        api_root: str = None,
+    ):
+        if compress is not None and compress not in COMPRESSION_METHODS:
+            raise ValueError(f"compress must be one of {', '.join(COMPRESSION_METHODS)}")
         self.app_id = app_id
         self.app_secret = app_secret
-        try:
-            token = self.load_saved_token()
-        except KeyError:
-            token = self.fetch_api_token()
-            self.token_saver(token)
-        self.client = self.create_client_for_token(token)
+        if api_root is not None:
+            self.API_ROOT = api_root.rstrip("/")
+            self.TOKEN_URL = f"{self.API_ROOT}/{VERSION}/token"
+            self.REFRESH_URL = f"{self.API_ROOT}/{VERSION}/token-refresh"
+        self.cache = cache
+        self.validate_models = validate_models
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.timeout = timeout
+        self.hooks = list(hooks)
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self.preprocess = preprocess
+        self.tokens = TokenManager(
+            app_id, app_secret, self.fetch_api_token, api_root=self.API_ROOT
+        )
+        self.tokens.get()
+        self.client = self.create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
 
     def prefix(self, version: str) -> str:
         return f"{self.API_ROOT}/{version}"
 
+    def registry(self, version: str = VERSION) -> ModelRegistry:
+        """Return the shared model registry for this client's API root."""
+        return get_registry(self.API_ROOT, version)
+
+    def check_models(self, models: List[str], version: str = VERSION) -> None:
+        """Raise InvalidRequest if any of ``models`` is not a supported model.
+
+        Uses the cached model registry, so a round-trip is only needed when
+        no model list has been cached yet. If it cannot be fetched, the check
+        is skipped and the API left to reject unknown models.
+        """
+        if not self.validate_models or not models:
+            return
+        unknown = self.registry(version).unknown(self, models)
+        if unknown:
+            raise InvalidRequest(f"Unknown model(s): {', '.join(unknown)}")
+
     def fetch_api_token(self) -> dict:
         backend = BackendApplicationClient(client_id=self.app_id)
         oauth = OAuth2Session(client=backend)
@@ -76,85 +257,184 @@ class SocialcontextClient:
             raise
         return token
 
-    def create_client_for_token(self, token: dict) -> OAuth2Session:
-        return OAuth2Session(
-            self.app_id,
-            token=token,
-            auto_refresh_url=self.REFRESH_URL,
-            auto_refresh_kwargs={},
-            token_updater=self.token_saver,
+    def create_session(
+        self,
+        *,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False,
+    ) -> requests.Session:
+        session = requests.Session()
+        # Retries are handled by dispatch, so the adapter must not retry.
+        adapter = TimedHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0,
         )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def pool_stats(self) -> Dict[str, dict]:
+        """Return connection reuse statistics per pooled host.
+
+        For each ``scheme://host:port``: the number of ``connections``
+        opened, ``requests`` sent, and the fraction of requests that reused
+        an existing connection. Many more connections than the pool size
+        suggests raising ``pool_maxsize``.
+        """
+        stats = {}
+        for adapter in set(self.client.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                opened, sent = pool.num_connections, pool.num_requests
+                stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                    "connections": opened,
+                    "requests": sent,
+                    "reuse": 1 - opened / sent if sent else 0.0,
+                    "pool_maxsize": pool.pool.maxsize if pool.pool else 0,
+                }
+        return stats
 
     def fernet(self, key: str) -> Fernet:
-        key = key + "=" * (len(key) % 4)
-        _key = base64.urlsafe_b64encode(base64.urlsafe_b64decode(key))
-        return Fernet(_key)
+        return make_fernet(key)
 
     def encrypt(self, data: str) -> bytes:
-        return self.fernet(self.app_secret).encrypt(data.encode())
+        return self.tokens.fernet.encrypt(data.encode())
 
     def decrypt(self, data: bytes) -> bytes:
-        return self.fernet(self.app_secret).decrypt(data)
+        return self.tokens.fernet.decrypt(data)
 
     def token_saver(self, token: dict) -> None:
-        logger.debug("SAVING TOKEN: %s" % str(token))
-        data = json.dumps(token)
-        _t = self.encrypt(data)
-        with dbm.open(KEY_DB.as_posix(), "c") as db:
-            db[self.app_id] = _t
+        self.tokens.save(token)
 
     def load_saved_token(self) -> dict:
-        with dbm.open(KEY_DB.as_posix(), "c") as db:
-            _token = db[self.app_id]
-        token = json.loads(self.decrypt(_token))
-        return token
+        return self.tokens.load()
 
     def clear_saved_token(self) -> None:
-        with dbm.open(KEY_DB.as_posix(), "c") as db:
-            if self.app_id in db:
-                del db[self.app_id]
+        self.tokens.clear()
+
+    def encode_body(self, data) -> Tuple[bytes, Dict[str, str], int]:
+        """Encode a JSON request body, compressing it if configured to.
+
+        Returns the body, the headers describing it, and the number of bytes
+        saved by compression.
+        """
+        body = json.dumps(data).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.compress is None or len(body) < self.compress_min_size:
+            return body, headers, 0
+        if self.compress == "gzip":
+            compressed = gzip.compress(body, compresslevel=6)
+        else:
+            compressed = zlib.compress(body, 6)
+        if len(compressed) >= len(body):
+            return body, headers, 0
+        headers["Content-Encoding"] = self.compress
+        return compressed, headers, len(body) - len(compressed)
 
     def dispatch(
-        self, _method: str, _url: str, data: dict = None, **query
+        self,
+        _method: str,
+        _url: str,
+        data: dict = None,
+        *,
+        headers: dict = None,
+        _saved: int = 0,
+        _idempotent: bool = None,
+        **query,
     ) -> requests.Response:
+        """Send a request, handling re-authentication, throttling and retries.
+
+        A 401 or 403 triggers one token refresh and re-send. Throttled and
+        server error responses, and connection errors, are retried according
+        to the client's retry policy, with every attempt passing through the
+        client's rate limiter. Once done, the client's hooks are called with a
+        RequestEvent describing the request.
+
+        ``_idempotent`` marks a request as safe to repeat, or not, for the
+        retry policy, overriding the default for its method.
+
+        The response's ``bytes_saved`` attribute is the number of request
+        bytes saved by body compression, plus ``_saved`` bytes the caller
+        saved by preprocessing.
+        """
         logger.debug(f"Fetching URL {_url}; method: {_method}")
         if data is not None:
             logger.debug(f"data: {data}")
         if query:
             logger.debug(f"query: {query}")
-        querystr = urllib.parse.urlencode(query)
-        try:
-            if _method == "get":
-                resp = self.client.get(f"{_url}?{querystr}")
-            elif _method == "post":
-                resp = self.client.post(_url, json=data)
-            elif _method == "put":
-                resp = self.client.put(_url, json=data)
-            elif _method == "delete":
-                resp = self.client.delete(_url, json=data)
-            else:
-                raise Exception("Unsupported dispatch method")
-            if resp.status_code in [400, 401, 403]:
-                raise MissingToken
-            return resp
-        except (oauthlib.oauth2.rfc6749.errors.MissingTokenError, MissingToken):
-            self.clear_saved_token()
-            token = self.fetch_api_token()
-            self.token_saver(token)
-            self.client = self.create_client_for_token(token)
-            if _method == "get":
-                return self.client.get(f"{_url}?{querystr}")
-            elif _method == "post":
-                return self.client.post(_url, json=data)
-            elif _method == "put":
-                return self.client.put(_url, json=data)
-            elif _method == "delete":
-                return self.client.delete(_url, json=data)
-            else:
-                raise Exception("Unsupported dispatch method")
-
-    def get(self, _url: str, **query) -> requests.Response:
-        r = self.dispatch("get", _url, **query)
+        if _method not in DISPATCH_METHODS:
+            raise Exception("Unsupported dispatch method")
+        url, kwargs = _url, {}
+        if _method == "get":
+            querystr = urllib.parse.urlencode(query)
+            url = f"{_url}?{querystr}"
+        elif data is not None:
+            body, body_headers, compressed = self.encode_body(data)
+            kwargs["data"] = body
+            headers = {**body_headers, **(headers or {})}
+            _saved += compressed
+        if headers:
+            kwargs["headers"] = headers
+        reauthenticated = False
+        attempt = 0
+        start = time.perf_counter()
+        _connect_time.value = 0.0
+        sent = received = 0
+        while True:
+            token = self.tokens.get()
+            resp = error = None
+            with self.limiter:
+                try:
+                    resp = self.client.request(
+                        _method.upper(),
+                        url,
+                        auth=BearerAuth(token),
+                        timeout=self.timeout,
+                        **kwargs,
+                    )
+                except requests.RequestException as e:
+                    error = e
+            if resp is not None:
+                sent += len(resp.request.body or b"")
+                received += len(resp.content)
+            if resp is not None and resp.status_code in [401, 403] and not reauthenticated:
+                self.tokens.refresh(stale=token)
+                reauthenticated = True
+                continue
+            self.limiter.record(resp)
+            delay = self.retry.delay(
+                attempt, _method, response=resp, error=error, idempotent=_idempotent
+            )
+            if delay is None:
+                if self.hooks:
+                    call_hooks(self.hooks, RequestEvent(
+                        method=_method.upper(),
+                        path=urllib.parse.urlsplit(_url).path,
+                        status=resp.status_code if resp is not None else None,
+                        bytes_sent=sent,
+                        bytes_received=received,
+                        connect=_connect_time.value,
+                        ttfb=resp.elapsed.total_seconds() if resp is not None else None,
+                        total=time.perf_counter() - start,
+                        retries=attempt,
+                        reauthenticated=reauthenticated,
+                        error=repr(error) if error is not None else None,
+                        bytes_saved=_saved,
+                    ))
+                if error is not None:
+                    raise error
+                resp.bytes_saved = _saved
+                return resp
+            logger.debug(f"Retrying {_method} {_url} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, _url: str, *, headers: dict = None, **query) -> requests.Response:
+        r = self.dispatch("get", _url, headers=headers, **query)
         return r
 
     def post(self, _url: str, data=None) -> requests.Response:
@@ -166,10 +446,12 @@ class SocialcontextClient:
     def delete(self, _url: str) -> requests.Response:
         return self.dispatch("delete", _url)
 
-    def pathget(self, path: str, version: str = VERSION, **query) -> requests.Response:
+    def pathget(
+        self, path: str, version: str = VERSION, *, headers: dict = None, **query
+    ) -> requests.Response:
         prefix = self.prefix(version)
         _url = f"{prefix}/{path}"
-        return self.get(_url, **query)
+        return self.get(_url, headers=headers, **query)
 
     def pathpost(
         self, path: str, version: str = VERSION, data: dict = None
@@ -210,6 +492,7 @@ class SocialcontextClient:
             options = []
         if input_file is None:
             raise Exception("Input file required.")
+        self.check_models(models, version)
         r = self.pathpost(
             "jobs",
             version,
@@ -237,28 +520,186 @@ class SocialcontextClient:
         return r
 
     def jobs(
-        self, *, job_id: str = None, version: str = VERSION
+        self, *, job_id: str = None, version: str = VERSION, headers: dict = None
     ) -> requests.Response:
-        """List jobs or show details of a specified job."""
+        """List jobs or show details of a specified job.
+
+        ``headers`` are sent with the request, e.g. ``If-None-Match`` for a
+        conditional request.
+        """
         if job_id:
-            r = self.pathget(f"jobs/{job_id}", version)
+            r = self.pathget(f"jobs/{job_id}", version, headers=headers)
         else:
-            r = self.pathget(f"jobs", version)
+            r = self.pathget("jobs", version, headers=headers)
         return r
 
+    def iter_jobs(
+        self,
+        *,
+        status: str = None,
+        since: str = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        version: str = VERSION,
+    ) -> Iterator[dict]:
+        """Iterate over the account's jobs, one page at a time.
+
+        ``status`` and ``since`` (an ISO 8601 date or time) are sent as query
+        parameters for the API to filter by. They are also applied to each
+        returned job, so results are correct whether or not the API supports
+        them. Further pages are requested while a response names a ``next``
+        page; a response without one is the last page.
+        """
+        query = {"page_size": page_size}
+        if status:
+            query["status"] = status
+        if since:
+            query["since"] = since
+        page = 1
+        while True:
+            r = self.pathget("jobs", version, page=page, **query)
+            r.raise_for_status()
+            data = r.json()
+            for job in data.get("jobs", []):
+                if status and str(job.get("status", "")).lower() != status.lower():
+                    continue
+                created = job.get("created_at") or job.get("created")
+                if since and isinstance(created, str) and created < since:
+                    continue
+                yield job
+            next_page = data.get("next")
+            if not next_page:
+                return
+            page = next_page if isinstance(next_page, int) else page + 1
+
     def models(self) -> requests.Response:
         """List supported inference models."""
         return self.pathget("models")
 
-    def classify(self, content_type, models=None, url=None, text=None) -> requests.Response:
-        """Classify a url for the given models."""
+    def classify(
+        self, content_type, models=None, url=None, text=None, *, preprocess: bool = None
+    ) -> requests.Response:
+        """Classify a url for the given models.
+
+        If the client has a result cache, models with cached results are
+        answered locally and only the remainder is requested.
+
+        With ``preprocess`` (by default, the client's setting), text is
+        cleaned up and truncated by ``socialcontext.text.preprocess_text``
+        first. The response's ``bytes_saved`` counts the bytes this and any
+        body compression saved.
+        """
+        self.check_models(models)
+        saved = 0
         if url:
-            return self.pathpost("classify", data={
-                "url": url,
-                "models": models })
+            data = {"url": url}
         elif text:
-            return self.pathpost("classify", data={
-                "text": text,
-                "models": models })
+            if self.preprocess if preprocess is None else preprocess:
+                max_length = self.registry().max_length(self, models) if models else None
+                processed = preprocess_text(text, max_length)
+                saved = len(text.encode("utf-8")) - len(processed.encode("utf-8"))
+                text = processed
+            data = {"text": text}
         else:
             raise InvalidRequest("Either url or text must be provided.")
+        classify_url = f"{self.prefix(VERSION)}/classify"
+        if self.cache is None or not models:
+            return self.dispatch(
+                "post", classify_url, data={**data, "models": models},
+                _saved=saved, _idempotent=True,
+            )
+        key = content_key(url=url, text=text, version=VERSION)
+        cached, payload = self.cache.get(key, models)
+        missing = [m for m in models if m not in cached]
+        if not missing:
+            return json_response(
+                {**payload, "classifications": cached}, url=self.prefix(VERSION)
+            )
+        r = self.dispatch(
+            "post", classify_url, data={**data, "models": missing},
+            _saved=saved, _idempotent=True,
+        )
+        if r.status_code != 200:
+            return r
+        result = r.json()
+        scores = result.get("classifications", {})
+        payload = {k: v for k, v in result.items() if k != "classifications"}
+        self.cache.put(key, payload, scores)
+        if cached:
+            result["classifications"] = {**cached, **scores}
+            return json_response(
+                result, status_code=r.status_code, url=r.url, bytes_saved=r.bytes_saved
+            )
+        return r
+
+    def _classify_item(self, content_type, models, item) -> dict:
+        if isinstance(item, dict):
+            r = self.classify(content_type, models=models, **item)
+        else:
+            r = self.classify(content_type, models=models, url=item.strip())
+        r.raise_for_status()
+        return r.json()
+
+    def classify_many(
+        self,
+        items: Iterable[Union[str, dict]],
+        models: List[str] = None,
+        *,
+        content_type: str = "news",
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ordered: bool = True,
+    ) -> Iterator[ClassifyResult]:
+        """Classify many items over a thread pool, yielding ClassifyResults.
+
+        Items are URL strings, or dicts of ``classify`` keyword arguments
+        (e.g. ``{"text": ...}``). Results are yielded in input order, or as
+        they complete if ``ordered`` is False. Errors are reported per item
+        and do not stop the batch.
+
+        The input is consumed lazily and at most ``2 * max_workers`` requests
+        are pending at once, so memory stays flat for arbitrarily large inputs.
+        """
+        window = max_workers * 2
+        source = enumerate(items)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque() if ordered else set()
+
+            def submit():
+                for index, item in source:
+                    future = executor.submit(
+                        self._classify_item, content_type, models, item
+                    )
+                    future.index, future.item = index, item
+                    if ordered:
+                        pending.append(future)
+                    else:
+                        pending.add(future)
+                    if len(pending) >= window:
+                        return
+
+            def result(future):
+                try:
+                    return ClassifyResult(future.index, future.item, data=future.result())
+                except Exception as e:
+                    return ClassifyResult(future.index, future.item, error=e)
+
+            submit()
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.difference_update(done)
+                for future in done:
+                    yield result(future)
+                submit()
+
+    def classify_dataset(
+        self, source, models: List[str] = None, **kwargs
+    ) -> Iterator[ClassifyResult]:
+        """Classify a dataset in realtime or as a batch job, by its size.
+
+        See ``socialcontext.router.classify_dataset`` for the arguments.
+        """
+        from .router import classify_dataset
+
+        return classify_dataset(self, source, models, **kwargs)
@@ -0,0 +1,180 @@
+"""
+Persistent local cache of classification results.
+
+Results are stored per (content key, model) in SQLite so that a request for a
+set of models can be served partly from the cache, with only the missing
+models sent to the API.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .paths import cache_dir
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Evictions are checked every this many writes rather than on every write.
+EVICT_EVERY = 1000
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key.
+
+    Lowercases the scheme and host, drops default ports and the fragment.
+    """
+    parts = urllib.parse.urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urllib.parse.urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def content_key(*, url: str = None, text: str = None, version: str) -> str:
+    """Return the cache key for a URL or a text body at an API version."""
+    if url:
+        return f"{version}|url|{normalize_url(url)}"
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{version}|text|{digest}"
+
+
+class ResultCache:
+    """SQLite-backed classification cache with TTL and LRU eviction.
+
+    ``ttl`` is in seconds; entries older than that are ignored and eventually
+    evicted. ``max_entries`` bounds the number of cached (content, model)
+    scores, evicting the least recently used. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = None,
+        *,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        if path is None:
+            path = cache_dir() / "classify.sqlite3"
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path.as_posix(), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS payloads (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scores (
+                key TEXT NOT NULL,
+                model TEXT NOT NULL,
+                score TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (key, model)
+            );
+            CREATE INDEX IF NOT EXISTS scores_accessed ON scores (accessed);
+            """
+        )
+
+    def get(self, key: str, models: List[str]) -> Tuple[Dict, Optional[dict]]:
+        """Return ``(scores, payload)`` for the cached subset of ``models``.
+
+        ``scores`` maps model name to score for each fresh cached model.
+        ``payload`` is the rest of the cached response, or None if nothing
+        usable is cached.
+        """
+        now = time.time()
+        oldest = now - self.ttl
+        marks = ",".join("?" * len(models))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT model, score FROM scores WHERE key = ? AND created >= ? "
+                f"AND model IN ({marks})",
+                [key, oldest, *models],
+            ).fetchall()
+            payload = None
+            if rows:
+                row = self._db.execute(
+                    "SELECT payload FROM payloads WHERE key = ?", [key]
+                ).fetchone()
+                if row is None:
+                    rows = []
+                else:
+                    payload = json.loads(row[0])
+                    self._db.execute(
+                        f"UPDATE scores SET accessed = ? WHERE key = ? AND model IN ({marks})",
+                        [now, key, *models],
+                    )
+                    self._db.commit()
+            scores = {model: json.loads(score) for model, score in rows}
+            if not scores:
+                self.misses += 1
+            elif len(scores) < len(set(models)):
+                self.partial_hits += 1
+            else:
+                self.hits += 1
+        return scores, payload
+
+    def put(self, key: str, payload: dict, scores: Dict) -> None:
+        """Store the response ``payload`` and per-model ``scores`` for a key."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO payloads (key, payload, created) VALUES (?, ?, ?)",
+                [key, json.dumps(payload), now],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scores (key, model, score, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(key, m, json.dumps(s), now, now) for m, s in scores.items()],
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM scores WHERE created < ?", [now - self.ttl])
+        (count,) = self._db.execute("SELECT COUNT(*) FROM scores").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM scores WHERE rowid IN "
+                "(SELECT rowid FROM scores ORDER BY accessed LIMIT ?)",
+                [excess],
+            )
+        self._db.execute(
+            "DELETE FROM payloads WHERE key NOT IN (SELECT DISTINCT key FROM scores)"
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this cache instance."""
+        return {
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM scores")
+            self._db.execute("DELETE FROM payloads")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,117 @@
+"""
+Checkpoints of streaming classification runs.
+
+A run classifies the lines of an input and appends one JSON record per line
+to an output file, in completion order. The checkpoint records which input
+lines are finished: every line below a low-water mark, plus the finished
+lines above it. A line that failed counts towards the mark too, so it does
+not hold it back, but is also listed as failed and is resubmitted on resume.
+Its new record is appended after the error record; the last record for a
+line is the current one. The checkpoint also records how much of the output
+it accounts for, so that on resume any records written after the last
+checkpoint are read back from the output rather than classified again.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Union
+
+
+class ClassifyCheckpoint:
+    """Checkpoint stored next to the output file as ``<output>.checkpoint.json``."""
+
+    def __init__(self, output_file: Union[str, Path]):
+        self.output_file = Path(output_file)
+        self.path = self.output_file.with_name(self.output_file.name + ".checkpoint.json")
+        self.source = None
+        self.low = 0
+        self.done = set()
+        self.failed = set()
+        self.offset = 0
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            self.source = data.get("source")
+            self.low = data.get("low", 0)
+            self.done = set(data.get("done", []))
+            self.failed = set(data.get("failed", []))
+            self.offset = data.get("offset", 0)
+
+    def save(self, offset: int) -> None:
+        """Atomically record progress, with ``offset`` bytes of output written."""
+        self.offset = offset
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "source": self.source,
+                    "low": self.low,
+                    "done": sorted(self.done),
+                    "failed": sorted(self.failed),
+                    "offset": offset,
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+
+    def resume(self, source: str) -> int:
+        """Prepare to resume a run over ``source``; return the output offset to continue at.
+
+        A different ``source`` starts over from the beginning. Otherwise the
+        output after the checkpointed offset is scanned, and each complete
+        record found there is marked finished, as failed if it is an error.
+        The output should be truncated to the returned offset, dropping any
+        partly written last record.
+        """
+        if source != self.source:
+            self.reset()
+            self.source = source
+            return 0
+        if not self.output_file.exists():
+            self.low, self.done, self.failed = 0, set(), set()
+            return 0
+        offset = min(self.offset, self.output_file.stat().st_size)
+        with open(self.output_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record.get("index"), int):
+                    self.mark(record["index"], failed="error" in record)
+        return offset
+
+    def finished(self, index: int) -> bool:
+        """Whether line ``index`` succeeded, and so is not to be submitted again."""
+        return (index < self.low or index in self.done) and index not in self.failed
+
+    def mark(self, index: int, *, failed: bool = False) -> None:
+        """Record the outcome of input line ``index``."""
+        if failed:
+            self.failed.add(index)
+        else:
+            self.failed.discard(index)
+        if index >= self.low:
+            self.done.add(index)
+        while self.low in self.done:
+            self.done.discard(self.low)
+            self.low += 1
+
+    @property
+    def count(self) -> int:
+        """Number of lines that succeeded."""
+        return self.low + len(self.done) - len(self.failed)
+
+    def reset(self) -> None:
+        """Forget all progress, so the next ``resume`` starts over."""
+        self.source, self.low, self.done, self.failed, self.offset = None, 0, set(), set(), 0
+
+
+def checkpoint_source(input_file: str, models, content_type: str) -> str:
+    """Identify a run by its input and settings; ``-`` is standard input."""
+    name = input_file if input_file == "-" else os.path.abspath(input_file)
+    return f"{name}#{content_type}#{','.join(sorted(models))}"
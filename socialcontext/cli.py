@@ -2,17 +2,36 @@
 Based on the Webster client implementation:
 https://github.com/scott2b/Webster/tree/main/client
 """
+import sys
+import time
 from enum import Enum
+from itertools import chain
+from pathlib import Path
 from typing import List
-from gzip import GzipFile
 import typer
-from .utils import ContentTypes, complete_content_type, output, Models, cache_models
-from .utils import VERSION, client
-from . import jobs
+from .utils import ContentTypes, complete_content_type, output, output_records, cache_models
+from .utils import OutputFormats, format_option
+from .utils import complete_model, validate_models, client, enable_timings
+from .constants import DEFAULT_MEMORY_BUDGET, DEFAULT_WORKERS, TERMINAL_STATUSES, VERSION
+from .constants import DEFAULT_CHECKPOINT_INTERVAL, DEFAULT_CLASSIFY_CONCURRENCY
+from .constants import DEFAULT_BINS, DEFAULT_CHUNK_ROWS
+from . import index, jobs
+from .export import ExportFormats, write_columnar
 
 
 app = typer.Typer()
 app.add_typer(jobs.app, name="jobs")
+app.add_typer(index.app, name="index")
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    timings: bool = typer.Option(False, "--timings", help="Print a per-request latency breakdown to stderr after the command."),
+):
+    """Client for the socialcontext.ai API."""
+    if timings:
+        enable_timings(ctx)
 
 
 @app.command()
@@ -22,9 +41,14 @@ def version():
 
 
 @app.command()
-def models():
+def models(format_: OutputFormats = format_option()):
     """Get the list of currently supported classification models."""
-    output(cache_models())
+    data = cache_models()
+    if format_ == OutputFormats.json:
+        output(data)
+    else:
+        records = [m if isinstance(m, dict) else {"name": m} for m in data["models"]]
+        output_records(records, format=format_)
 
 
 @app.command()
@@ -36,14 +60,48 @@ def classify(
     ),
     url: str = typer.Option("", help="Web URL to classify"),
     text: str = typer.Option("", help="Text to classify"),
-    models: List[Models()] = typer.Argument(..., help="classification models"),
+    input_file: str = typer.Option(
+        None, "--input", help="File of URLs to classify, one per line, or - for stdin. May be gzipped."
+    ),
+    output_file: Path = typer.Option(
+        None, help="With --input, JSONL file to write results to. Enables checkpointing."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_CLASSIFY_CONCURRENCY, help="With --input, number of concurrent requests."
+    ),
+    checkpoint_interval: float = typer.Option(
+        DEFAULT_CHECKPOINT_INTERVAL, help="Seconds between checkpoints of --input progress."
+    ),
+    resume: bool = typer.Option(
+        True, help="Resume an interrupted --input run from its checkpoint."
+    ),
+    format_: OutputFormats = format_option(),
+    models: List[str] = typer.Argument(
+        ...,
+        help="classification models",
+        callback=validate_models,
+        autocompletion=complete_model,
+    ),
 ):
     """Classify provided text or text extracted from a provided URL.
 
-    One of either --url or --text must be provided.
+    One of either --url, --text or --input must be provided.
+
+    With --input, every URL in the file is classified using --concurrency
+    requests at a time, and a JSON record per URL is written as each
+    completes. With --output-file, progress is checkpointed every
+    --checkpoint-interval seconds, and a rerun after a crash or Ctrl-C skips
+    the URLs already classified and retries those that failed; the last
+    record for a line is the current one.
     """
-    models = [m.value for m in models]
-    if url:
+    models = list(models)
+    if input_file:
+        _classify_input(
+            input_file, output_file, models, content_type.value,
+            concurrency=concurrency, checkpoint_interval=checkpoint_interval, resume=resume,
+        )
+        return
+    elif url:
         r = client().classify(content_type, models=models, url=url)
     elif text:
         r = client().classify(content_type, models=models, text=text)
@@ -54,44 +112,72 @@ def classify(
             )
         )
         raise typer.Exit()
-    output(r.json())
-
-
-# s3
-
-_s3_resource = None
-
-
-def s3_resource():
-    import boto3
+    output(r.json(), format=format_)
 
-    global _s3_resource
-    if _s3_resource is None:
-        _s3_resource = boto3.resource("s3")
-    return _s3_resource
-
-
-def s3_client():
-    resource = s3_resource()
-    return resource.meta.client
 
+def _classify_input(
+    input_file, output_file, models, content_type, *, concurrency, checkpoint_interval, resume
+):
+    from .checkpoint import ClassifyCheckpoint, checkpoint_source
+    from .prepare import read_urls
+    from .utils import dumps
 
-def parse_path(path):
-    assert path.startswith("s3://"), f"Invalid s3 path: {path}"
-    bucket = path.split("/")[2]
-    key = "/".join(path.split("/")[3:]).strip("/")
-    return bucket, key
+    if input_file == "-":
+        urls = (line.strip() for line in sys.stdin if line.strip())
+    else:
+        urls = read_urls(input_file)
+    checkpoint = None
+    if output_file is None:
+        sink = sys.stdout.buffer
+    else:
+        checkpoint = ClassifyCheckpoint(output_file)
+        if not resume:
+            checkpoint.reset()
+        offset = checkpoint.resume(checkpoint_source(input_file, models, content_type))
+        if checkpoint.count or checkpoint.failed:
+            typer.echo(
+                f"Resuming: {checkpoint.count} URLs already classified, "
+                f"{len(checkpoint.failed)} failed URLs to retry",
+                err=True,
+            )
+        sink = open(output_file, "r+b" if output_file.exists() else "wb")
+        sink.seek(offset)
+        sink.truncate()
+        checkpoint.save(offset)
+    # classify_many numbers the items it is given; map them back to input lines.
+    lines = {}
 
+    def todo():
+        submitted = 0
+        for line, url in enumerate(urls):
+            if checkpoint is None or not checkpoint.finished(line):
+                lines[submitted] = line
+                submitted += 1
+                yield url
 
-def iterate_file(bucket, key, encoding="utf-8"):
-    obj = s3_resource().Object(bucket, key).get()["Body"]
-    if key.endswith(".gz"):
-        obj = GzipFile(None, "rb", fileobj=obj)
-        for line in obj:
-            yield line.decode(encoding).strip()
-    else:
-        for line in obj.iter_lines():
-            yield line.decode(encoding).strip()
+    last_save = time.monotonic()
+    try:
+        results = client().classify_many(
+            todo(), models, content_type=content_type, max_workers=concurrency, ordered=False
+        )
+        for result in results:
+            line = lines.pop(result.index)
+            if result.error is None:
+                record = {"index": line, "url": result.item, **result.data}
+            else:
+                record = {"index": line, "url": result.item, "error": str(result.error)}
+            sink.write(dumps(record).encode("utf-8") + b"\n")
+            if checkpoint is not None:
+                checkpoint.mark(line, failed=result.error is not None)
+                if time.monotonic() - last_save >= checkpoint_interval:
+                    sink.flush()
+                    checkpoint.save(sink.tell())
+                    last_save = time.monotonic()
+    finally:
+        sink.flush()
+        if checkpoint is not None:
+            checkpoint.save(sink.tell())
+            sink.close()
 
 
 class DownloadFileTypes(str, Enum):
@@ -102,10 +188,34 @@ class DownloadFileTypes(str, Enum):
 @app.command()
 def download(
     path: str = typer.Argument(..., help="s3 output folder to download"),
-    output_file: typer.FileTextWrite = typer.Option(None, help="Output file to write."),
+    output_file: Path = typer.Option(None, help="Output file to write."),
     file_type: DownloadFileTypes = typer.Option(
         "data", help="Type of output files to download."
     ),
+    workers: int = typer.Option(
+        DEFAULT_WORKERS, help="Number of output files to fetch concurrently."
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+        help="Maximum MB of fetched output files to buffer ahead of writing.",
+    ),
+    format_: ExportFormats = typer.Option(
+        "csv",
+        "--format",
+        help="Output format. Columnar formats require --output-file.",
+    ),
+    resume: bool = typer.Option(
+        True,
+        help="Keep parts already downloaded to --output-file and fetch only "
+        "new or changed parts.",
+    ),
+    follow: bool = typer.Option(
+        False, help="Keep polling for new output parts and append them."
+    ),
+    poll_interval: float = typer.Option(30.0, help="Seconds between polls with --follow."),
+    job_id: str = typer.Option(
+        None, help="With --follow, stop once this job has finished."
+    ),
 ):
     """Download the output data from a batch job output location.  Downloads
     job output as a single stream and does the work of stripping CSV headers
@@ -114,27 +224,143 @@ def download(
     Provided as a convenience for simplifying management of batch output CSV
     downloads to be consolidated. For general batch file management, the AWS
     CLI is recommended.
+
+    When writing CSV to --output-file, progress is recorded in a
+    <output-file>.manifest.json file so that an interrupted or repeated
+    download only fetches parts it does not already have. --follow keeps
+    appending new parts as the batch system writes them, until interrupted or
+    until the job given by --job-id finishes.
+
+    With --format parquet, arrow or feather the CSV output is converted to a
+    single typed, compressed columnar file: model scores as floats, URLs as
+    strings and domains dictionary-encoded.
     """
-    s3 = s3_resource()
-    s3_client = s3.meta.client
+    from .s3 import download_to_file, list_parts, parse_path, prefetch_parts, stream_parts, write_parts
+
+    if output_file is None and (format_ != ExportFormats.csv or follow):
+        need = "--follow" if follow else f"{format_.value} output"
+        typer.echo(
+            typer.style(
+                f"--output-file is required for {need}.",
+                fg=typer.colors.RED,
+                bold=True,
+            )
+        )
+        raise typer.Exit(code=1)
     bucket, path = parse_path(path)
-    response = s3_client.list_objects(Bucket=bucket, Prefix=path)
-    files = []
-    for item in response.get("Contents", []):
-        key = item["Key"]
-        name = key.split("/")[-1]
-        if name.startswith(f"{file_type}-"):
-            files.append(key)
-    files = sorted(files)
-    for df_i, key in enumerate(files):
-        fn = f"s3://{bucket}/{key}"
-        for i, line in enumerate(iterate_file(bucket, key)):
-            if df_i > 0 and i == 0:  # skip headers after the first file
-                continue
-            if output_file:
-                output_file.write(f"{line}\n")
-            else:
-                typer.echo(line)
+    budget = memory_budget * 1024 * 1024
+    if format_ != ExportFormats.csv:
+        parts = list_parts(bucket, path, file_type.value)
+        fetched = prefetch_parts(bucket, parts, workers=workers, memory_budget=budget)
+        write_columnar(fetched, output_file, format_)
+        return
+    if output_file is None:
+        parts = list_parts(bucket, path, file_type.value)
+        streamed = stream_parts(bucket, parts, workers=workers, memory_budget=budget)
+        write_parts(streamed, sys.stdout.buffer)
+        return
+    from .watch import job_status
+
+    while True:
+        finished = (
+            follow
+            and job_id is not None
+            and job_status(client().jobs(job_id=job_id).json()) in TERMINAL_STATUSES
+        )
+        download_to_file(
+            bucket,
+            path,
+            output_file,
+            file_type=file_type.value,
+            workers=workers,
+            memory_budget=budget,
+            resume=resume,
+        )
+        if not follow or finished:
+            break
+        resume = True
+        time.sleep(poll_interval)
+
+
+@app.command()
+def analyze(
+    paths: List[str] = typer.Argument(
+        ..., help="s3 output folders, or local output CSV files (may be compressed)."
+    ),
+    threshold: List[float] = typer.Option(
+        None, "--threshold", help="Score at or above which a URL is blocked. May be repeated. [default: 0.5]"
+    ),
+    model: List[str] = typer.Option(
+        None, "--model", help="Model to analyze. May be repeated. Defaults to every score column."
+    ),
+    quantile: List[float] = typer.Option(
+        None, "--quantile", help="Score quantile to report. May be repeated. [default: 0.5, 0.9, 0.95, 0.99]"
+    ),
+    bins: int = typer.Option(DEFAULT_BINS, help="Number of score histogram bins."),
+    chunk_rows: int = typer.Option(DEFAULT_CHUNK_ROWS, help="Rows parsed into memory at a time."),
+    workers: int = typer.Option(
+        DEFAULT_WORKERS, help="Number of s3 output files to fetch concurrently."
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+        help="Maximum MB of fetched s3 output files to buffer ahead of analysis.",
+    ),
+    format_: OutputFormats = format_option(),
+):
+    """Compute block rates and score statistics over job output.
+
+    For each --threshold, reports the share of URLs blocked (any model
+    scoring at or above it) and recovered, per-model block rates, and how
+    often each pair of models blocks the same URL. Also reports per-model
+    score histograms and quantiles. Output is read in a single streaming
+    pass. Requires the analyze extra: pip install socialcontext[analyze]
+
+    The json format gives the full analysis; jsonl and csv give one summary
+    record per threshold and model.
+    """
+    from .analyze import (
+        DEFAULT_QUANTILES,
+        DEFAULT_THRESHOLDS,
+        analyze_parts,
+        local_parts,
+        s3_parts,
+        summary_records,
+    )
+
+    s3_paths = [path for path in paths if path.startswith("s3://")]
+    if s3_paths and len(s3_paths) < len(paths):
+        typer.echo(
+            typer.style(
+                "Paths must be either all s3 output folders or all local files.",
+                fg=typer.colors.RED,
+                bold=True,
+            ),
+            err=True,
+        )
+        raise typer.Exit(code=1)
+    if s3_paths:
+        from .s3 import parse_path
+
+        parts = chain.from_iterable(
+            s3_parts(
+                *parse_path(path), workers=workers, memory_budget=memory_budget * 1024 * 1024
+            )
+            for path in s3_paths
+        )
+    else:
+        parts = local_parts(paths)
+    result = analyze_parts(
+        parts,
+        thresholds=threshold or DEFAULT_THRESHOLDS,
+        models=model or None,
+        bins=bins,
+        quantiles=quantile or DEFAULT_QUANTILES,
+        chunk_rows=chunk_rows,
+    )
+    if format_ == OutputFormats.json:
+        output(result)
+    else:
+        output_records(summary_records(result), format=format_)
 
 
 def run():
@@ -0,0 +1,42 @@
+"""
+API constants, kept free of heavy imports so the CLI can load them quickly.
+"""
+import os
+
+API_ROOT = os.environ.get("SOCIALCONTEXT_API_ROOT", "https://api.socialcontext.ai")
+VERSION = "v1"
+
+DEFAULT_BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+SUCCESS_STATUSES = frozenset(["completed", "complete", "succeeded"])
+TERMINAL_STATUSES = SUCCESS_STATUSES | frozenset(
+    ["failed", "cancelled", "canceled", "error"]
+)
+
+# Defaults used by CLI options are defined here, rather than in the modules
+# implementing them, so that building the CLI does not import those modules.
+
+# Download
+DEFAULT_WORKERS = 4
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Job input preparation
+DEFAULT_RUN_SIZE = 1_000_000
+DEFAULT_UPLOAD_CONCURRENCY = 8
+
+# Fan-out
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Streaming classify
+DEFAULT_CLASSIFY_CONCURRENCY = 8
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+
+# Analysis
+DEFAULT_BINS = 20
+DEFAULT_CHUNK_ROWS = 65536
+
+# Job watching
+DEFAULT_MIN_INTERVAL = 5.0
+DEFAULT_MAX_INTERVAL = 120.0
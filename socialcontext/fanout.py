@@ -0,0 +1,176 @@
+"""
+Fan-out/fan-in orchestration of very large batch inputs.
+
+A FanoutJob splits one input into shards, runs one batch job per shard
+concurrently, reschedules only the shards whose jobs fail, and merges all
+shard outputs into a single stream with one CSV header, as ``download`` does.
+"""
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Union
+
+from .constants import DEFAULT_BATCH_SIZE, DEFAULT_MAX_ATTEMPTS, SUCCESS_STATUSES
+from .prepare import DEFAULT_RUN_SIZE, prepare_input, upload_files
+from .s3 import (
+    DEFAULT_MEMORY_BUDGET,
+    DEFAULT_WORKERS,
+    list_parts,
+    parse_path,
+    stream_parts,
+    write_parts,
+)
+from .watch import JobState, JobWatcher
+
+DEFAULT_SUBMIT_WORKERS = 8
+
+
+class Shard:
+    """One input shard and the batch job processing it."""
+
+    def __init__(self, index: int, input_file: str, output_path: str):
+        self.index = index
+        self.input_file = input_file
+        self.output_path = output_path
+        self.job_id = None
+        self.status = None
+        self.attempts = 0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status in SUCCESS_STATUSES
+
+
+class FanoutJob:
+    """Run a set of input shards as concurrent batch jobs and merge the output.
+
+    ``inputs`` are ``s3://`` input files readable by the batch system. Each
+    shard's output is written to ``{output_path}/shard-NNNN/``.
+    """
+
+    def __init__(
+        self,
+        client,
+        inputs: List[str],
+        output_path: str,
+        *,
+        models: List[str] = None,
+        content_type: str = "news",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        workers: int = DEFAULT_SUBMIT_WORKERS,
+    ):
+        self.client = client
+        self.models = models or []
+        self.content_type = content_type
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.workers = workers
+        self.prepared = None
+        output_path = output_path.rstrip("/")
+        self.shards = [
+            Shard(i, input_file, f"{output_path}/shard-{i:04}/")
+            for i, input_file in enumerate(inputs)
+        ]
+
+    @classmethod
+    def from_local(
+        cls,
+        client,
+        local_file: Union[str, Path],
+        s3_path: str,
+        shards: int,
+        *,
+        run_size: int = DEFAULT_RUN_SIZE,
+        **kwargs,
+    ) -> "FanoutJob":
+        """Deduplicate and split a local URL list into ``shards`` uploaded inputs.
+
+        Inputs are uploaded under ``{s3_path}/input/`` and outputs are written
+        under ``{s3_path}/output/``.
+        """
+        s3_path = s3_path.rstrip("/")
+        bucket, prefix = parse_path(f"{s3_path}/input/")
+        with tempfile.TemporaryDirectory() as workdir:
+            prepared = prepare_input(
+                local_file, workdir, shards=shards, run_size=run_size, name="shard"
+            )
+            inputs = upload_files(prepared.files, bucket, prefix)
+        job = cls(client, inputs, f"{s3_path}/output/", **kwargs)
+        job.prepared = prepared
+        return job
+
+    def _map(self, fn, shards):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(fn, shards))
+
+    def _start(self, shard: Shard) -> None:
+        if shard.job_id is None:
+            r = self.client.create_job(
+                content_type=self.content_type,
+                input_file=shard.input_file,
+                output_path=shard.output_path,
+                models=self.models,
+                batch_size=self.batch_size,
+            )
+            r.raise_for_status()
+            shard.job_id = r.json()["job_id"]
+        r = self.client.update_job(shard.job_id, action="schedule")
+        r.raise_for_status()
+        shard.status = None
+        shard.attempts += 1
+
+    def submit(self, shards: List[Shard] = None) -> None:
+        """Create (if needed) and schedule jobs for shards, concurrently."""
+        self._map(self._start, self.shards if shards is None else shards)
+
+    def watch(self, **kwargs) -> Iterator[JobState]:
+        """Watch the jobs of all unfinished shards until they finish.
+
+        Keyword arguments are passed to JobWatcher.
+        """
+        by_job = {s.job_id: s for s in self.shards if s.job_id and not s.succeeded}
+        watcher = JobWatcher(self.client, list(by_job), **kwargs)
+        for state in watcher.watch():
+            by_job[state.job_id].status = state.status
+            yield state
+
+    @property
+    def failed(self) -> List[Shard]:
+        return [s for s in self.shards if s.status is not None and not s.succeeded]
+
+    def run(self, **kwargs) -> Iterator[JobState]:
+        """Submit all shards and watch them, rescheduling failed shards.
+
+        A failed shard's job is rescheduled until it has been attempted
+        ``max_attempts`` times. Yields job states as they are polled.
+        """
+        self.submit([s for s in self.shards if s.job_id is None])
+        while True:
+            yield from self.watch(**kwargs)
+            retry = [s for s in self.failed if s.attempts < self.max_attempts]
+            if not retry:
+                return
+            self.submit(retry)
+
+    def merge(
+        self,
+        sink: BinaryIO,
+        *,
+        file_type: str = "data",
+        workers: int = DEFAULT_WORKERS,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    ) -> int:
+        """Write the output of all shards, in shard order, to one binary stream.
+
+        Only the first CSV header is kept. Returns the number of bytes written.
+        """
+        written = 0
+        for shard in self.shards:
+            bucket, prefix = parse_path(shard.output_path)
+            parts = list_parts(bucket, f"{prefix}/", file_type)
+            streamed = stream_parts(
+                bucket, parts, workers=workers, memory_budget=memory_budget
+            )
+            written += write_parts(streamed, sink, first=written == 0)
+        return written
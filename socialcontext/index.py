@@ -0,0 +1,92 @@
+"""
+Local URL index commands.
+"""
+from pathlib import Path
+from typing import List, Optional
+import typer
+
+from .constants import DEFAULT_MEMORY_BUDGET, DEFAULT_WORKERS
+from .utils import OutputFormats, format_option, output, output_records
+
+app = typer.Typer(help="Local URL index commands.")
+
+
+@app.command()
+def build(
+    path: str = typer.Argument(..., help="s3 output folder of a job to index."),
+    index: Path = typer.Option(..., help="Directory of the index to create or add to."),
+    workers: int = typer.Option(
+        DEFAULT_WORKERS, help="Number of output files to fetch concurrently."
+    ),
+    memory_budget: int = typer.Option(
+        DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+        help="Maximum MB of fetched output files to buffer ahead of indexing.",
+    ),
+    format_: Optional[OutputFormats] = typer.Option(
+        None, "--format", help="Write a json, jsonl or csv record of key and rows for each part indexed."
+    ),
+):
+    """Index a job's output by URL for fast lookups.
+
+    The output is read once. Running build again, with the same or another
+    output folder, adds only parts that are new or have changed since they
+    were indexed; URLs found again point to their latest result.
+    """
+    from .s3 import parse_path
+    from .urlindex import URLIndex
+
+    bucket, prefix = parse_path(path)
+    with URLIndex(index) as url_index:
+        added = rows = 0
+
+        def indexed():
+            nonlocal added, rows
+            for part, count in url_index.build(
+                bucket, prefix, workers=workers, memory_budget=memory_budget * 1024 * 1024
+            ):
+                added += 1
+                rows += count
+                if format_ is None:
+                    typer.echo(f"{part['Key']}  {count} rows", err=True)
+                yield {"key": part["Key"], "rows": count}
+
+        if format_ is None:
+            for _ in indexed():
+                pass
+        else:
+            output_records(indexed(), format=format_)
+        typer.echo(
+            f"Indexed {rows} rows from {added} new parts; {len(url_index)} URLs in index",
+            err=True,
+        )
+
+
+@app.command()
+def lookup(
+    urls: List[str] = typer.Argument(None, help="URLs to look up."),
+    index: Path = typer.Option(..., help="Directory of the index."),
+    input_file: Path = typer.Option(None, "--input", help="File of URLs to look up, one per line."),
+    format_: OutputFormats = format_option(),
+):
+    """Look up the results for URLs in an index.
+
+    URLs that are not in the index are reported with null classifications.
+    """
+    from .urlindex import URLIndex
+
+    urls = list(urls or [])
+    if input_file is not None:
+        with open(input_file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip()]
+    if not index.exists():
+        typer.echo(
+            typer.style(f"No index at {index}", fg=typer.colors.RED, bold=True),
+            err=True,
+        )
+        raise typer.Exit(code=1)
+    with URLIndex(index) as url_index:
+        records = [
+            url_index.lookup(url) or {"url": url, "classifications": None}
+            for url in urls
+        ]
+    output(records, format=format_)
@@ -3,33 +3,44 @@ Batch job management commands.
 """
 import json
 import os
-import re
-import sys
+import tempfile
 from os.path import expanduser
+from pathlib import Path
 from typing import List, Optional
-from .utils import ContentTypes, complete_content_type, output, Models
-from .utils import VERSION, BATCHES_BUCKET, client
+from .utils import ContentTypes, complete_content_type, output, output_records
+from .utils import OutputFormats, format_option
+from .utils import complete_model, validate_models, client
 import typer
 
-from .api import DEFAULT_BATCH_SIZE, MIN_BATCH_SIZE, MAX_BATCH_SIZE
+from .constants import DEFAULT_BATCH_SIZE, MIN_BATCH_SIZE, MAX_BATCH_SIZE, SUCCESS_STATUSES
+from .constants import DEFAULT_MAX_ATTEMPTS, DEFAULT_RUN_SIZE, DEFAULT_UPLOAD_CONCURRENCY
+from .constants import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL
 
 app = typer.Typer(help="Batch job managment commands.")
 
 
 @app.command('list')
-def list_():
-    """List batch jobs for account."""
-    r = client().jobs()
-    output(r.json())
+def list_(
+    status: str = typer.Option(None, help="Only list jobs with this status."),
+    since: str = typer.Option(None, help="Only list jobs created since this ISO 8601 date."),
+    format_: OutputFormats = format_option(),
+):
+    """List batch jobs for account.
+
+    Jobs are fetched a page at a time and written as they arrive. The json
+    format keeps the API's {"jobs": [...]} shape.
+    """
+    output_records(client().iter_jobs(status=status, since=since), format=format_, key="jobs")
 
 
 @app.command()
 def info(
-    job_id: str = typer.Argument(..., help="Job ID.")
+    job_id: str = typer.Argument(..., help="Job ID."),
+    format_: OutputFormats = format_option(),
 ):
     """Show details for a job specified by ID."""
     r = client().jobs(job_id=job_id)
-    output(r.json())
+    output(r.json(), format=format_)
 
 
 @app.command()
@@ -39,9 +50,11 @@ def create(
     output_path: str = typer.Option(None, help="Location to write output files.  Must be writeable by the socialcontext batch system."),
     batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help=f"Size of written data batches between {MIN_BATCH_SIZE} and {MAX_BATCH_SIZE}. " \
         "Numbers out of range will be coerced to the valid minimum or maximum value without error"),
+    auto_batch_size: bool = typer.Option(False, help="Profile the input file and choose the batch size from it, ignoring --batch-size."),
     profile: str = typer.Option(None, help="Read optons from a ~/.socialcontext.json profile"),
     options: Optional[List[str]] = typer.Option(None, help="Options reserved for administrative use."),
-    models: List[Models()] = typer.Argument(None, help="Classification models")
+    format_: OutputFormats = format_option(),
+    models: List[str] = typer.Argument(None, help="Classification models", callback=validate_models, autocompletion=complete_model)
 ):
     """Submit a job for batch processing.
 
@@ -55,7 +68,7 @@ def create(
     """
     content_type = content_type.value
     if models:
-        models = [m.value for m in models]
+        models = list(models)
     else:
         models = []
     options = list(options) or []
@@ -69,6 +82,16 @@ def create(
         options = list(set(options))
     if output_path is None:
         output_path = '/'.join(input_file.split('/')[:-1]) + '/'
+    if auto_batch_size:
+        from .profile import choose_batch_size, predicted_parts, profile_input
+
+        input_profile = profile_input(input_file)
+        batch_size = choose_batch_size(input_profile)
+        typer.echo(
+            f"{input_profile.lines} URLs: batch size {batch_size}, "
+            f"about {predicted_parts(input_profile, batch_size)} output parts",
+            err=True,
+        )
     info = {
         'input_file': input_file,
         'output_path': output_path,
@@ -78,33 +101,224 @@ def create(
         'options': options
     }
     r = client().create_job(**info)
-    output(r.json())
+    output(r.json(), format=format_)
+
+
+@app.command('profile')
+def profile_(
+    input_file: str = typer.Argument(..., help="Local or s3:// file of URLs, one per line. May be gzipped."),
+    target_parts: int = typer.Option(None, help="Number of output parts to aim for when choosing the batch size."),
+    format_: OutputFormats = format_option(),
+):
+    """Profile a job input file and recommend a batch size.
+
+    The file is streamed once in constant memory. Reports the number of
+    URLs, estimates of the distinct URLs and domains, the share of URLs on
+    the most common domains, and the batch size and number of output parts
+    `jobs create --auto-batch-size` would use.
+    """
+    from .profile import TARGET_PARTS, choose_batch_size, predicted_parts, profile_input
+
+    input_profile = profile_input(input_file)
+    batch_size = choose_batch_size(input_profile, target_parts=target_parts or TARGET_PARTS)
+    output({
+        'lines': input_profile.lines,
+        'distinct_urls': input_profile.distinct_urls,
+        'duplicate_share': round(input_profile.duplicate_share, 4),
+        'distinct_domains': input_profile.distinct_domains,
+        'top_domains': dict(input_profile.top_domains),
+        'top_domain_share': round(input_profile.top_domain_share, 4),
+        'top10_domain_share': round(input_profile.top10_domain_share, 4),
+        'batch_size': batch_size,
+        'predicted_parts': predicted_parts(input_profile, batch_size),
+    }, format=format_)
+
+
+@app.command()
+def prepare(
+    content_type: ContentTypes=typer.Option("news", help="Content type. Currently only news is supported.", autocompletion=complete_content_type),
+    local_file: Path = typer.Argument(..., help="Local file of URLs, one per line. May be gzipped."),
+    s3_path: str = typer.Option(..., help="s3:// folder to upload the prepared input files to."),
+    output_path: str = typer.Option(None, help="Location to write output files. Defaults to --s3-path."),
+    batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help=f"Size of written data batches between {MIN_BATCH_SIZE} and {MAX_BATCH_SIZE}."),
+    shards: int = typer.Option(1, help="Number of input files to write. A job is created for each."),
+    run_size: int = typer.Option(DEFAULT_RUN_SIZE, help="URLs held in memory per sorted run while deduplicating."),
+    upload_concurrency: int = typer.Option(DEFAULT_UPLOAD_CONCURRENCY, help="Concurrent upload threads."),
+    create: bool = typer.Option(True, help="Create a job for each uploaded input file."),
+    format_: OutputFormats = format_option(),
+    models: List[str] = typer.Argument(None, help="Classification models", callback=validate_models, autocompletion=complete_model)
+):
+    """Canonicalize, deduplicate and upload a local URL list, then create jobs.
+
+    URLs are normalized and stripped of tracking parameters, and duplicates
+    removed using bounded memory, so inputs of any size can be prepared. The
+    unique URLs are written as gzip files, uploaded to --s3-path, and a job is
+    created for each uploaded file.
+    """
+    from .prepare import prepare_input, upload_files
+    from .s3 import parse_path
+
+    bucket, prefix = parse_path(s3_path)
+    with tempfile.TemporaryDirectory() as workdir:
+        prepared = prepare_input(
+            local_file, workdir, shards=shards, run_size=run_size,
+            name=local_file.name.split(".")[0],
+        )
+        typer.echo(
+            f"{prepared.input_count} input URLs, {prepared.unique_count} unique",
+            err=True,
+        )
+        uploaded = upload_files(
+            prepared.files, bucket, prefix, concurrency=upload_concurrency
+        )
+    if not create:
+        output([{"input_file": path} for path in uploaded], format=format_)
+        return
+    if output_path is None:
+        output_path = s3_path.rstrip('/') + '/'
+    models = list(models) if models else []
+    jobs = (
+        client().create_job(
+            input_file=input_file,
+            output_path=output_path,
+            content_type=content_type.value,
+            batch_size=batch_size,
+            models=models,
+        ).json()
+        for input_file in uploaded
+    )
+    output_records(jobs, format=format_)
+
+
+@app.command()
+def fanout(
+    content_type: ContentTypes=typer.Option("news", help="Content type. Currently only news is supported.", autocompletion=complete_content_type),
+    local_file: Path = typer.Argument(..., help="Local file of URLs, one per line. May be gzipped."),
+    s3_path: str = typer.Option(..., help="s3:// folder for shard inputs and outputs."),
+    shards: int = typer.Option(..., help="Number of shards, and so of jobs, to run."),
+    output_file: Path = typer.Option(..., help="File to write the merged output to."),
+    batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help=f"Size of written data batches between {MIN_BATCH_SIZE} and {MAX_BATCH_SIZE}."),
+    max_attempts: int = typer.Option(DEFAULT_MAX_ATTEMPTS, help="Times to run a shard's job before giving up on it."),
+    format_: OutputFormats = format_option(),
+    models: List[str] = typer.Argument(None, help="Classification models", callback=validate_models, autocompletion=complete_model)
+):
+    """Split an input into shards, run a job per shard, and merge the output.
+
+    The input is deduplicated and split into --shards files uploaded under
+    <s3-path>/input/. A job is created and scheduled for each, writing to
+    <s3-path>/output/shard-NNNN/. Failed shards are rescheduled up to
+    --max-attempts times. Once all shards have finished, their output is
+    merged into --output-file with a single CSV header.
+    """
+    from .fanout import FanoutJob
+
+    models = list(models) if models else []
+    job = FanoutJob.from_local(
+        client(), local_file, s3_path, shards,
+        models=models, content_type=content_type.value,
+        batch_size=batch_size, max_attempts=max_attempts,
+    )
+    typer.echo(
+        f"{job.prepared.input_count} input URLs, {job.prepared.unique_count} unique, "
+        f"{len(job.shards)} shards",
+        err=True,
+    )
+    for state in job.run():
+        typer.echo(f"{state.job_id}  {state.status or '-'}", err=True)
+    if job.failed:
+        output(
+            [{"shard": s.index, "job_id": s.job_id, "status": s.status} for s in job.failed],
+            format=format_,
+        )
+        raise typer.Exit(code=1)
+    with open(output_file, "wb") as f:
+        job.merge(f)
 
 
 @app.command()
 def run(
-    job_id: str = typer.Argument(..., help="The unique ID of the job.""")
+    job_id: str = typer.Argument(..., help="The unique ID of the job."""),
+    format_: OutputFormats = format_option(),
 ):
     """Schedule a previously cancelled or failed batch job for execution."""
     info = { 'action': 'schedule' }
     r = client().update_job(job_id, **info)
-    output(r.json())
+    output(r.json(), format=format_)
 
 
 @app.command()
 def cancel(
-    job_id: str = typer.Argument(..., help="The unique ID of the job.""")
+    job_id: str = typer.Argument(..., help="The unique ID of the job."""),
+    format_: OutputFormats = format_option(),
 ):
     """Cancel a running job."""
     info = { 'action': 'cancel' }
     r = client().update_job(job_id, **info)
-    output(r.json())
+    output(r.json(), format=format_)
 
 
 @app.command()
 def delete(
-    job_id: str = typer.Argument(..., help="The unique ID of the job.""")
+    job_id: str = typer.Argument(..., help="The unique ID of the job."""),
+    format_: OutputFormats = format_option(),
 ):
     """Delete a job."""
     r = client().delete_job(job_id)
-    output(r.json())
+    output(r.json(), format=format_)
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+@app.command()
+def watch(
+    job_ids: List[str] = typer.Argument(..., help="IDs of the jobs to watch."),
+    min_interval: float = typer.Option(DEFAULT_MIN_INTERVAL, help="Shortest seconds between polls of a job."),
+    max_interval: float = typer.Option(DEFAULT_MAX_INTERVAL, help="Longest seconds between polls of a job."),
+    format_: Optional[OutputFormats] = typer.Option(
+        None, "--format", help="Write job states as json, jsonl or csv records instead of progress lines."
+    ),
+):
+    """Monitor jobs until they all finish, reporting throughput and ETA.
+
+    With --format, each change in a job's state is written as a record of
+    job_id, status, processed, total, rate and eta (seconds).
+
+    Exits with status 0 if every job completed successfully, or 1 if any job
+    failed or was cancelled.
+    """
+    from .watch import JobWatcher
+
+    watcher = JobWatcher(
+        client(), job_ids, min_interval=min_interval, max_interval=max_interval
+    )
+    if format_ is not None:
+        records = (
+            {
+                "job_id": state.job_id,
+                "status": state.status,
+                "processed": state.processed,
+                "total": state.total,
+                "rate": state.rate,
+                "eta": state.eta,
+            }
+            for state in watcher.watch()
+        )
+        output_records(records, format=format_)
+        failed = [s for s in watcher.states.values() if s.status not in SUCCESS_STATUSES]
+        raise typer.Exit(code=1 if failed else 0)
+    for state in watcher.watch():
+        processed = "-" if state.processed is None else state.processed
+        total = "-" if state.total is None else state.total
+        rate = "-" if state.rate is None else f"{state.rate:.1f}"
+        typer.echo(
+            f"{state.job_id}  {state.status or '-'}  {processed}/{total} URLs  "
+            f"{rate} URLs/s  ETA {_format_duration(state.eta)}"
+        )
+    failed = [s for s in watcher.states.values() if s.status not in SUCCESS_STATUSES]
+    raise typer.Exit(code=1 if failed else 0)
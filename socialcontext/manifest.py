@@ -0,0 +1,71 @@
+"""
+Local manifest of downloaded job output parts.
+
+The manifest records, for each part written to a download's output file, the
+part's key and ETag and the byte range it occupies in the output. A later
+download of the same prefix to the same file keeps every leading part that
+is unchanged and still fully present, truncates the output after them, and
+fetches only what follows.
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Tuple, Union
+
+
+class DownloadManifest:
+    """Manifest stored next to the output file as ``<output>.manifest.json``."""
+
+    def __init__(self, output_file: Union[str, Path]):
+        self.output_file = Path(output_file)
+        self.path = self.output_file.with_name(self.output_file.name + ".manifest.json")
+        self.source = None
+        self.parts = []
+        if self.path.exists():
+            with open(self.path) as f:
+                data = json.load(f)
+            self.source = data.get("source")
+            self.parts = data.get("parts", [])
+
+    def save(self) -> None:
+        """Atomically replace the manifest file."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "parts": self.parts}, f)
+        os.replace(tmp, self.path)
+
+    def resume_point(self, source: str, parts: List[dict]) -> Tuple[int, int]:
+        """Return ``(index, offset)`` to resume downloading ``parts`` from.
+
+        ``parts[:index]`` are already in the output file, which should be
+        truncated to ``offset`` bytes before writing ``parts[index:]``. The
+        manifest is reset to match.
+        """
+        if source != self.source:
+            self.source, self.parts = source, []
+        size = self.output_file.stat().st_size if self.output_file.exists() else 0
+        index = 0
+        for done, part in zip(self.parts, parts):
+            if (
+                done["key"] != part["Key"]
+                or done["etag"] != part["ETag"]
+                or done["end"] > size
+            ):
+                break
+            index += 1
+        self.parts = self.parts[:index]
+        offset = self.parts[-1]["end"] if self.parts else 0
+        return index, offset
+
+    def record(self, part: dict, start: int, nbytes: int) -> None:
+        """Record that ``part`` occupies ``nbytes`` bytes from ``start``."""
+        self.parts.append(
+            {
+                "key": part["Key"],
+                "etag": part["ETag"],
+                "start": start,
+                "end": start + nbytes,
+                "bytes": nbytes,
+            }
+        )
+        self.save()
@@ -0,0 +1,217 @@
+"""
+Request instrumentation.
+
+Clients call each of their hooks with a RequestEvent after every request.
+MetricsCollector is a hook that aggregates events into per-endpoint
+histograms, and can render them as a Prometheus text exposition snapshot or
+as a latency summary table.
+"""
+import bisect
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger("socialcontext")
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Path segments that identify a resource, such as job IDs.
+ID_SEGMENT = re.compile(r"^(?:[0-9]+|[0-9a-fA-F-]{16,})$")
+
+
+class RequestEvent(NamedTuple):
+    """What happened during one dispatched request, including any retries.
+
+    Timings are in seconds. ``connect`` is the time spent opening new
+    connections, including name resolution and any TLS handshake; it is 0.0
+    when pooled connections were reused. ``ttfb`` is the time from sending
+    the final attempt until its response headers arrived. ``total`` covers
+    the whole dispatch, retries and back-off included. Byte counts are of
+    request and response bodies, summed over attempts. ``bytes_saved`` is
+    the number of request body bytes saved by compression and text
+    preprocessing.
+    """
+
+    method: str
+    path: str
+    status: Optional[int]
+    bytes_sent: int
+    bytes_received: int
+    connect: float
+    ttfb: Optional[float]
+    total: float
+    retries: int
+    reauthenticated: bool
+    error: Optional[str] = None
+    bytes_saved: int = 0
+
+
+Hook = Callable[[RequestEvent], None]
+
+
+def call_hooks(hooks: Sequence[Hook], event: RequestEvent) -> None:
+    """Call each hook with ``event``. Hook errors are logged, not raised."""
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            logger.debug(f"Request hook {hook!r} failed: {e}")
+
+
+def endpoint(path: str) -> str:
+    """Collapse resource IDs in a path, e.g. ``/v1/jobs/abc123...`` to ``/v1/jobs/:id``."""
+    return "/".join(":id" if ID_SEGMENT.match(s) else s for s in path.split("/"))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as used by Prometheus."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """``(upper bound, count)`` pairs, ending with ``(inf, count)``."""
+        pairs, running = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            pairs.append((bound, running))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, n in zip(self.buckets, self.counts):
+            if seen + n >= rank and n:
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+
+class EndpointStats:
+    def __init__(self, buckets: Sequence[float]):
+        self.total = Histogram(buckets)
+        self.connect = Histogram(buckets)
+        self.ttfb = Histogram(buckets)
+        self.statuses: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.bytes_saved = 0
+        self.retries = 0
+        self.reauthentications = 0
+
+
+class MetricsCollector:
+    """Request hook aggregating events per method and endpoint.
+
+    Pass it in a client's ``hooks``, then read ``stats``, or render them with
+    ``prometheus_text`` or ``summary``. Safe to share between threads.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.stats: Dict[Tuple[str, str], EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: RequestEvent) -> None:
+        key = (event.method.upper(), endpoint(event.path))
+        status = str(event.status) if event.status is not None else "error"
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = EndpointStats(self.buckets)
+            stats.total.observe(event.total)
+            stats.connect.observe(event.connect)
+            if event.ttfb is not None:
+                stats.ttfb.observe(event.ttfb)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes_sent += event.bytes_sent
+            stats.bytes_received += event.bytes_received
+            stats.bytes_saved += event.bytes_saved
+            stats.retries += event.retries
+            stats.reauthentications += int(event.reauthenticated)
+
+    def prometheus_text(self, prefix: str = "socialcontext") -> str:
+        """Render a snapshot in the Prometheus text exposition format."""
+        lines = []
+
+        def labels(method, path, **extra):
+            pairs = {"method": method, "path": path, **extra}
+            return ",".join(f'{k}="{v}"' for k, v in pairs.items())
+
+        with self._lock:
+            items = sorted(self.stats.items())
+            for name, attr, help_text in (
+                ("request_duration_seconds", "total", "Total request time, including retries."),
+                ("request_connect_seconds", "connect", "Time spent opening connections."),
+                ("request_ttfb_seconds", "ttfb", "Time to the first response byte."),
+            ):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (method, path), stats in items:
+                    histogram = getattr(stats, attr)
+                    for bound, count in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{{{labels(method, path, le=le)}}} {count}")
+                    lines.append(f"{metric}_sum{{{labels(method, path)}}} {histogram.sum}")
+                    lines.append(f"{metric}_count{{{labels(method, path)}}} {histogram.count}")
+            metric = f"{prefix}_requests_total"
+            lines.append(f"# HELP {metric} Requests by response status.")
+            lines.append(f"# TYPE {metric} counter")
+            for (method, path), stats in items:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f"{metric}{{{labels(method, path, status=status)}}} {count}")
+            for name, attr, help_text in (
+                ("request_bytes_total", "bytes_sent", "Request body bytes sent."),
+                ("response_bytes_total", "bytes_received", "Response body bytes received."),
+                ("request_bytes_saved_total", "bytes_saved", "Request body bytes saved by compression and preprocessing."),
+                ("retries_total", "retries", "Request attempts retried."),
+                ("reauthentications_total", "reauthentications", "Token refreshes after a 401 or 403."),
+            ):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for (method, path), stats in items:
+                    lines.append(f"{metric}{{{labels(method, path)}}} {getattr(stats, attr)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Render a per-endpoint latency breakdown table, in milliseconds."""
+
+        def ms(value):
+            return "-" if value is None else f"{value * 1000:.1f}"
+
+        header = (
+            f"{'request':<32} {'count':>6} {'p50':>8} {'p99':>8} "
+            f"{'connect':>8} {'ttfb':>8} {'retries':>7} {'reauth':>6}"
+        )
+        lines = [header]
+        with self._lock:
+            for (method, path), stats in sorted(self.stats.items()):
+                lines.append(
+                    f"{method + ' ' + path:<32} {stats.total.count:>6} "
+                    f"{ms(stats.total.quantile(0.5)):>8} {ms(stats.total.quantile(0.99)):>8} "
+                    f"{ms(stats.connect.mean):>8} {ms(stats.ttfb.mean):>8} "
+                    f"{stats.retries:>7} {stats.reauthentications:>6}"
+                )
+        return "\n".join(lines)
@@ -0,0 +1,21 @@
+"""
+User-writable locations for socialcontext local state.
+"""
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """Return the socialcontext user cache directory, creating it if needed.
+
+    Honors ``SOCIALCONTEXT_CACHE_DIR``, then ``XDG_CACHE_HOME``, and falls back
+    to ``~/.cache/socialcontext``.
+    """
+    path = os.environ.get("SOCIALCONTEXT_CACHE_DIR")
+    if path:
+        path = Path(path)
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        path = Path(base) / "socialcontext"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,145 @@
+"""
+Preparation of batch job input files.
+
+Streams a local URL list, canonicalizes each URL, removes duplicates with an
+external sort (sorted runs on disk merged with a heap, so memory is bounded
+by the run size rather than the input size), and writes the unique URLs as
+sharded gzip files ready for upload to S3.
+"""
+import gzip
+import heapq
+import os
+import tempfile
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Union
+
+from .cache import normalize_url
+from .constants import DEFAULT_RUN_SIZE, DEFAULT_UPLOAD_CONCURRENCY
+
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+
+TRACKING_PARAMS = frozenset(
+    ["fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "_ga", "yclid"]
+)
+
+
+def canonicalize_url(url: str) -> str:
+    """Canonicalize a URL for deduplication.
+
+    In addition to ``normalize_url``, drops ``utm_*`` and other tracking
+    query parameters and sorts the remaining ones.
+    """
+    url = normalize_url(url)
+    if "?" not in url:
+        return url
+    parts = urllib.parse.urlsplit(url)
+    query = [
+        (k, v)
+        for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query = urllib.parse.urlencode(sorted(query))
+    return urllib.parse.urlunsplit(parts._replace(query=query))
+
+
+class PreparedInput(NamedTuple):
+    input_count: int
+    unique_count: int
+    files: List[Path]
+
+
+def read_urls(path: Union[str, Path]) -> Iterator[str]:
+    """Yield the non-blank lines of a plain or gzipped local file, stripped."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _write_run(urls: List[str], workdir: Path, n: int) -> Path:
+    path = workdir / f"run-{n:05}.txt"
+    with open(path, "w", encoding="utf-8") as f:
+        for url in sorted(set(urls)):
+            f.write(url + "\n")
+    return path
+
+
+def prepare_input(
+    path: Union[str, Path],
+    output_dir: Union[str, Path],
+    *,
+    shards: int = 1,
+    run_size: int = DEFAULT_RUN_SIZE,
+    name: str = "urls",
+) -> PreparedInput:
+    """Canonicalize and deduplicate a URL list into ``shards`` gzip files.
+
+    At most ``run_size`` URLs are held in memory at once. Unique URLs are
+    written round-robin to ``{name}-{shard}.txt.gz`` files in ``output_dir``,
+    in sorted order within each shard.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    input_count = unique_count = 0
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp:
+        workdir = Path(tmp)
+        runs, batch = [], []
+        for url in read_urls(path):
+            input_count += 1
+            batch.append(canonicalize_url(url))
+            if len(batch) >= run_size:
+                runs.append(_write_run(batch, workdir, len(runs)))
+                batch = []
+        if batch or not runs:
+            runs.append(_write_run(batch, workdir, len(runs)))
+        del batch
+        files = [output_dir / f"{name}-{i:04}.txt.gz" for i in range(shards)]
+        with ExitStack() as stack:
+            inputs = [stack.enter_context(open(run, encoding="utf-8")) for run in runs]
+            outputs = [stack.enter_context(gzip.open(f, "wt", encoding="utf-8")) for f in files]
+            previous = None
+            for line in heapq.merge(*inputs):
+                if line == previous:
+                    continue
+                previous = line
+                outputs[unique_count % shards].write(line)
+                unique_count += 1
+    return PreparedInput(input_count, unique_count, files)
+
+
+def upload_files(
+    files: List[Path],
+    bucket: str,
+    prefix: str,
+    *,
+    concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+) -> List[str]:
+    """Upload files to ``s3://bucket/prefix/`` with concurrent multipart uploads.
+
+    Files are uploaded in parallel, and each large file is itself split into
+    parts uploaded by ``concurrency`` threads. Returns the ``s3://`` paths.
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    from .s3 import s3_client
+
+    config = TransferConfig(
+        multipart_threshold=MULTIPART_CHUNKSIZE,
+        multipart_chunksize=MULTIPART_CHUNKSIZE,
+        max_concurrency=concurrency,
+    )
+    client = s3_client()
+    prefix = prefix.strip("/")
+
+    def upload(path):
+        key = f"{prefix}/{path.name}" if prefix else path.name
+        client.upload_file(os.fspath(path), bucket, key, Config=config)
+        return f"s3://{bucket}/{key}"
+
+    with ThreadPoolExecutor(max_workers=min(len(files), concurrency) or 1) as executor:
+        return list(executor.map(upload, files))
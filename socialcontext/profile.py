@@ -0,0 +1,150 @@
+"""
+Profiling of batch job input files.
+
+Streams a URL list once, in constant memory, to count lines, estimate the
+number of distinct URLs and domains with HyperLogLog sketches, and measure
+how concentrated the URLs are on a few domains. The profile is used to
+choose a batch size, and so the number of output parts, for a job.
+"""
+import hashlib
+import math
+from collections import Counter
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from .constants import MAX_BATCH_SIZE, MIN_BATCH_SIZE
+from .prepare import canonicalize_url, read_urls
+
+DEFAULT_PRECISION = 14
+
+# Aim for about this many output parts: fewer, larger parts take longer to
+# appear and to fetch, while more, smaller ones add listing and request
+# overhead.
+TARGET_PARTS = 200
+
+# Domains tracked exactly for skew; beyond this the rarest are pruned.
+MAX_TRACKED_DOMAINS = 100_000
+
+# Above this share of URLs in the top 10 domains, batches are halved so that
+# parts dominated by a few slow domains stay short.
+SKEW_SHARE = 0.5
+
+
+class HyperLogLog:
+    """HyperLogLog distinct count sketch with ``2 ** precision`` registers.
+
+    The standard error is about ``1.04 / sqrt(2 ** precision)``, 0.8% at
+    the default precision, using 16 KB.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def add(self, value: str) -> None:
+        h = int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        estimate = self.alpha * self.size ** 2 / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+
+class InputProfile(NamedTuple):
+    lines: int
+    distinct_urls: int
+    distinct_domains: int
+    top_domains: List[Tuple[str, int]]
+    top_domain_share: float
+    top10_domain_share: float
+
+    @property
+    def duplicate_share(self) -> float:
+        if not self.lines:
+            return 0.0
+        return max(0.0, 1 - self.distinct_urls / self.lines)
+
+
+def domain(url: str) -> str:
+    """Host of a canonicalized URL, without any ``www.`` prefix or port."""
+    start = url.find("://")
+    start = start + 3 if start >= 0 else 0
+    end = len(url)
+    for sep in "/?#":
+        i = url.find(sep, start)
+        if i >= 0:
+            end = min(end, i)
+    host = url[start:end].rsplit("@", 1)[-1].split(":", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def input_lines(path: str) -> Iterator[str]:
+    """Yield the non-blank lines of a local or ``s3://`` file, gzip-aware."""
+    if path.startswith("s3://"):
+        from .s3 import iterate_file, parse_path
+
+        bucket, key = parse_path(path)
+        return (line for line in iterate_file(bucket, key) if line)
+    return read_urls(path)
+
+
+def profile_urls(urls: Iterable[str], *, precision: int = DEFAULT_PRECISION) -> InputProfile:
+    """Profile URLs in one pass.
+
+    Domain counts are exact while there are at most MAX_TRACKED_DOMAINS
+    domains; past that the rarest are dropped, so the top domains and skew
+    remain accurate but are slight underestimates.
+    """
+    urls_hll, domains_hll = HyperLogLog(precision), HyperLogLog(precision)
+    domains = Counter()
+    lines = 0
+    for url in urls:
+        lines += 1
+        url = canonicalize_url(url)
+        urls_hll.add(url)
+        name = domain(url)
+        domains_hll.add(name)
+        domains[name] += 1
+        if len(domains) > MAX_TRACKED_DOMAINS:
+            domains = Counter(dict(domains.most_common(MAX_TRACKED_DOMAINS // 2)))
+    top = domains.most_common(10)
+    return InputProfile(
+        lines=lines,
+        distinct_urls=min(lines, urls_hll.count()),
+        distinct_domains=min(lines, domains_hll.count()),
+        top_domains=top,
+        top_domain_share=top[0][1] / lines if top else 0.0,
+        top10_domain_share=sum(n for _, n in top) / lines if top else 0.0,
+    )
+
+
+def profile_input(path: str, **kwargs) -> InputProfile:
+    """Profile a local or ``s3://`` input file, plain or gzipped."""
+    return profile_urls(input_lines(path), **kwargs)
+
+
+def choose_batch_size(profile: InputProfile, *, target_parts: int = TARGET_PARTS) -> int:
+    """Pick a batch size within MIN_BATCH_SIZE..MAX_BATCH_SIZE for an input.
+
+    Aims for about ``target_parts`` output parts, using smaller batches when
+    the input is concentrated on a few domains.
+    """
+    size = profile.lines / target_parts
+    if profile.top10_domain_share > SKEW_SHARE:
+        size /= 2
+    size = int(round(size, -2))
+    return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, size))
+
+
+def predicted_parts(profile: InputProfile, batch_size: int) -> int:
+    return math.ceil(profile.lines / batch_size) if profile.lines else 0
@@ -0,0 +1,184 @@
+"""
+Registry of supported classification models.
+
+Model metadata is cached in the user cache directory, one file per API root
+and version. Cached data is served for ``ttl`` seconds; after that it is
+still served while a background thread revalidates it with a conditional
+request. Registries are shared by all clients in a process.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .constants import API_ROOT, VERSION
+from .paths import cache_dir
+
+logger = logging.getLogger("socialcontext")
+
+DEFAULT_TTL = 24 * 3600
+
+# Model metadata fields that may give the longest text, in characters, a
+# model reads.
+MAX_LENGTH_FIELDS = ("max_input_length", "max_length", "max_chars", "max_text_length")
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def registry_path(api_root: str, version: str) -> Path:
+    digest = hashlib.sha1(api_root.encode("utf-8")).hexdigest()[:12]
+    return cache_dir() / f"models-{digest}-{version}.json"
+
+
+def get_registry(api_root: str = API_ROOT, version: str = VERSION) -> "ModelRegistry":
+    """Return the process-wide registry for an API root and version."""
+    with _registries_lock:
+        key = (api_root, version)
+        if key not in _registries:
+            _registries[key] = ModelRegistry(api_root, version)
+        return _registries[key]
+
+
+class ModelRegistry:
+    """Cached model metadata for one API root and version.
+
+    ``data`` is the models endpoint response, ``{"models": [...]}``, where
+    each model is either a name or a dict of metadata with a ``name`` key.
+    """
+
+    def __init__(self, api_root: str, version: str, *, ttl: float = DEFAULT_TTL):
+        self.api_root = api_root
+        self.version = version
+        self.ttl = ttl
+        self.path = registry_path(api_root, version)
+        self.data = None
+        self.etag = None
+        self.fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.data = cached.get("data")
+        self.etag = cached.get("etag")
+        self.fetched_at = cached.get("fetched_at", 0.0)
+
+    def save(self) -> None:
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(
+                {"data": self.data, "etag": self.etag, "fetched_at": self.fetched_at}, f
+            )
+        os.replace(tmp, self.path)
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl
+
+    def fetch(self, client) -> None:
+        """Fetch or revalidate the model list through ``client``."""
+        headers = {"If-None-Match": self.etag} if self.etag and self.data else None
+        r = client.pathget("models", self.version, headers=headers)
+        if r.status_code != 304:
+            r.raise_for_status()
+            self.data = r.json()
+            self.etag = r.headers.get("ETag")
+        self.fetched_at = time.time()
+        self.save()
+
+    def _refresh_in_background(self, client) -> None:
+        def refresh():
+            try:
+                with self._lock:
+                    if self.stale:
+                        self.fetch(client)
+            except Exception as e:
+                logger.debug(f"Model registry refresh failed: {e}")
+            finally:
+                self._refreshing = None
+
+        with self._lock:
+            if self._refreshing is None:
+                self._refreshing = threading.Thread(target=refresh, daemon=True)
+                self._refreshing.start()
+
+    def get(self, client, *, refresh: bool = False) -> dict:
+        """Return the model data, fetching it if there is none or ``refresh``.
+
+        Stale data is returned immediately while it is revalidated in the
+        background.
+        """
+        if self.data is None or refresh:
+            with self._lock:
+                if self.data is None or refresh:
+                    self.fetch(client)
+        elif self.stale:
+            self._refresh_in_background(client)
+        return self.data
+
+    def models(self, client) -> Dict[str, dict]:
+        """Return a mapping of model name to its metadata."""
+        models = {}
+        for model in self.get(client).get("models", []):
+            if isinstance(model, dict):
+                models[model["name"]] = model
+            else:
+                models[model] = {"name": model}
+        return models
+
+    def names(self, client) -> List[str]:
+        return list(self.models(client))
+
+    def models_if_available(self, client) -> Optional[Dict[str, dict]]:
+        """Return ``models(client)``, or None if it cannot be fetched.
+
+        For best-effort local checks: a failure is logged, leaving the API to
+        judge the request.
+        """
+        try:
+            return self.models(client)
+        except Exception as e:
+            logger.warning(f"Could not fetch the model list, skipping local model checks: {e}")
+            return None
+
+    def unknown(self, client, names: List[str]) -> List[str]:
+        """Return the given model names that are not supported.
+
+        Empty if the model list cannot be fetched and none is cached.
+        """
+        supported = self.models_if_available(client)
+        if supported is None:
+            return []
+        return [name for name in names if name not in supported]
+
+    def max_length(self, client, names: List[str]) -> Optional[int]:
+        """Return the shortest maximum input length of the given models.
+
+        None if no model's metadata gives one, or the model list cannot be
+        fetched.
+        """
+        models = self.models_if_available(client) or {}
+        lengths = []
+        for name in names:
+            metadata = models.get(name, {})
+            for field in MAX_LENGTH_FIELDS:
+                if isinstance(metadata.get(field), int):
+                    lengths.append(metadata[field])
+                    break
+        return min(lengths) if lengths else None
+
+    def cached_names(self) -> Optional[List[str]]:
+        """Model names from the cache only, without network access."""
+        if self.data is None:
+            return None
+        return [m["name"] if isinstance(m, dict) else m for m in self.data.get("models", [])]
@@ -0,0 +1,214 @@
+"""
+Retry and client-side rate limiting for API requests.
+
+``RetryPolicy`` decides whether and how long to wait before re-sending a
+request. ``RateLimiter`` combines an optional token bucket with an AIMD
+(additive increase, multiplicative decrease) concurrency limit that backs off
+when the API throttles and ramps back up while responses are healthy.
+"""
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+THROTTLE_STATUSES = frozenset([429, 503])
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(["get", "head", "options", "put", "delete"])
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the delay in seconds requested by a Retry-After header value."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def never_sent(error: Exception) -> bool:
+    """Whether a request failed before any of it could reach the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+class RetryPolicy:
+    """Jittered exponential backoff honoring Retry-After.
+
+    The delay before retry ``n`` (counting from 0) is drawn uniformly from
+    ``[0, min(max_backoff, backoff_factor * 2 ** n)]``. A Retry-After header
+    on the response takes precedence, up to ``max_retry_after`` seconds.
+
+    Requests that are not idempotent, by default those using a method outside
+    IDEMPOTENT_METHODS such as POST, may already have taken effect when a
+    server error or read timeout is seen, so they are only retried when the
+    server certainly did not act on them: on a 429, a 503 with Retry-After,
+    or a connection that could not be established.
+
+    Subclass and override ``delay`` to customize which requests are retried.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = 5,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_after: float = 120.0,
+        statuses=RETRY_STATUSES,
+        retry_connection_errors: bool = True,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = frozenset(statuses)
+        self.retry_connection_errors = retry_connection_errors
+
+    def backoff(self, attempt: int) -> float:
+        cap = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        return random.uniform(0, cap)
+
+    def delay(
+        self,
+        attempt: int,
+        method: str,
+        response: Optional[requests.Response] = None,
+        error: Optional[Exception] = None,
+        *,
+        idempotent: Optional[bool] = None,
+    ) -> Optional[float]:
+        """Return seconds to wait before retrying, or None to stop.
+
+        ``attempt`` is the number of retries already made. Exactly one of
+        ``response`` or ``error`` is given. ``idempotent`` overrides the
+        default for ``method``, e.g. for a POST that is safe to repeat.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if idempotent is None:
+            idempotent = method.lower() in IDEMPOTENT_METHODS
+        if error is not None:
+            if not self.retry_connection_errors:
+                return None
+            if idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return self.backoff(attempt)
+            if never_sent(error):
+                return self.backoff(attempt)
+            return None
+        if response.status_code not in self.statuses:
+            return None
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if not idempotent and not (
+            response.status_code == 429 or (response.status_code == 503 and retry_after is not None)
+        ):
+            return None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return self.backoff(attempt)
+
+
+class NoRetry(RetryPolicy):
+    """A policy that never retries."""
+
+    def delay(self, attempt, method, response=None, error=None, *, idempotent=None):
+        return None
+
+
+class RateLimiter:
+    """Token bucket plus AIMD adaptive concurrency limit.
+
+    If ``rate`` is given, requests are started at no more than ``rate`` per
+    second with bursts of up to ``burst``. Independently, the number of
+    requests in flight is capped by a limit that starts at
+    ``initial_concurrency``, grows by about one per limit's worth of healthy
+    responses, and is halved (no lower than ``min_concurrency``) on each
+    throttled response. A Retry-After on a throttled response pauses all new
+    requests until it has elapsed.
+
+    Use as a context manager around each request, then report the outcome
+    with ``record``.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        initial_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_concurrency: int = 256,
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.limit = float(initial_concurrency)
+        self.in_flight = 0
+        self.throttled = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate is None:
+            return
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0 and self.rate is not None and self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+            if self.rate is not None:
+                self._tokens -= 1
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def record(self, response: Optional[requests.Response]) -> None:
+        """Adjust the concurrency limit from a request's outcome."""
+        with self._cond:
+            if response is not None and response.status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after:
+                    self._paused_until = max(
+                        self._paused_until, time.monotonic() + retry_after
+                    )
+            elif response is not None and response.status_code < 500:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self._cond.notify_all()
@@ -0,0 +1,171 @@
+"""
+Routing of classification workloads between realtime and batch processing.
+
+``classify_dataset`` counts the input, stopping as soon as it is known to be
+large. Inputs of up to ``realtime_limit`` URLs are classified with concurrent
+realtime requests; larger ones are uploaded, run as a batch job, and their
+output indexed by URL and joined back to the input. Either way the caller
+gets an iterator of ClassifyResults, one per input URL in input order.
+"""
+import logging
+import os
+import tempfile
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+
+from .api import DEFAULT_MAX_WORKERS, ClassifyResult
+from .constants import DEFAULT_BATCH_SIZE, DEFAULT_MEMORY_BUDGET, DEFAULT_WORKERS
+from .fanout import FanoutJob, Shard
+from .prepare import canonicalize_url, read_urls
+from .s3 import iterate_file, parse_path
+from .urlindex import URLIndex
+
+logger = logging.getLogger("socialcontext")
+
+# Above this many URLs a batch job is cheaper than realtime requests.
+DEFAULT_REALTIME_LIMIT = 10_000
+
+
+class BatchFailed(Exception):
+    ...
+
+
+class MissingResult(Exception):
+    """An input URL has no row in the batch job output."""
+
+
+def _s3_urls(path: str) -> Iterator[str]:
+    bucket, key = parse_path(path)
+    return (line for line in iterate_file(bucket, key) if line)
+
+
+def join_results(
+    shards: List[Shard],
+    urls: Iterable[str],
+    models: List[str] = None,
+    *,
+    index_path: Union[str, Path],
+    workers: int = DEFAULT_WORKERS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+) -> Iterator[ClassifyResult]:
+    """Yield a ClassifyResult for each input URL from its batch output row.
+
+    The shards' output is indexed by URL in a URLIndex at ``index_path``,
+    then ``urls`` are looked up in order, as given or else canonicalized as
+    ``prepare_input`` uploads them. Results carry the input position and URL,
+    as realtime results do; a URL with no output row gets a MissingResult
+    error.
+    """
+    with URLIndex(index_path) as url_index:
+        for shard in shards:
+            bucket, prefix = parse_path(shard.output_path)
+            for _ in url_index.build(
+                bucket, f"{prefix}/", workers=workers, memory_budget=memory_budget
+            ):
+                pass
+        for index, url in enumerate(urls):
+            result = url_index.lookup(url, models) or url_index.lookup(
+                canonicalize_url(url), models
+            )
+            if result is None:
+                yield ClassifyResult(
+                    index, url, error=MissingResult(f"No batch output row for {url}")
+                )
+            else:
+                yield ClassifyResult(index, url, result)
+
+
+def classify_dataset(
+    client,
+    source: Union[str, Path, Iterable[str]],
+    models: List[str] = None,
+    *,
+    content_type: str = "news",
+    s3_path: str = None,
+    realtime_limit: int = DEFAULT_REALTIME_LIMIT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **watch_kwargs,
+) -> Iterator[ClassifyResult]:
+    """Classify a dataset of URLs by whichever of realtime or batch is cheaper.
+
+    ``source`` is a local file of URLs (plain or gzipped), an ``s3://`` file,
+    or an iterable of URLs. At most ``realtime_limit + 1`` URLs are read to
+    size it, so large inputs are never counted in full.
+
+    Small inputs go through ``classify_many``. Large inputs are deduplicated
+    and uploaded under ``s3_path``, run as a batch job, watched until done
+    (``watch_kwargs`` are passed to JobWatcher), and their output joined back
+    to the input with ``join_results``. Either way there is one result per
+    input URL, in input order, with the input position as its index and the
+    URL as its item; a URL that failed has an error instead of data. Batch
+    results' data is the output row (see ``row_result``). An ``s3://``
+    source is used as the job input directly. Without an ``s3_path`` to stage a local input in,
+    large inputs are classified in realtime anyway. Raises BatchFailed if the
+    batch job does not complete.
+    """
+    models = list(models) if models else []
+    is_s3 = isinstance(source, str) and source.startswith("s3://")
+    if is_s3:
+        urls = _s3_urls(source)
+    elif isinstance(source, (str, Path)):
+        urls = read_urls(source)
+    else:
+        urls = iter(source)
+    head = list(islice(urls, realtime_limit + 1))
+    if len(head) > realtime_limit and not is_s3 and s3_path is None:
+        logger.warning(
+            f"More than {realtime_limit} URLs but no s3_path to stage a batch job; "
+            "classifying in realtime."
+        )
+    elif len(head) > realtime_limit:
+        yield from _classify_batch(
+            client, source, head, urls, models,
+            content_type=content_type, s3_path=s3_path,
+            batch_size=batch_size, **watch_kwargs,
+        )
+        return
+    yield from client.classify_many(
+        chain(head, urls), models, content_type=content_type, max_workers=max_workers
+    )
+
+
+def _classify_batch(
+    client, source, head, rest, models, *, content_type, s3_path, batch_size, **watch_kwargs
+) -> Iterator[ClassifyResult]:
+    options = dict(models=models, content_type=content_type, batch_size=batch_size)
+    with tempfile.TemporaryDirectory() as workdir:
+        # input_urls is only read, to join the output back to, once the job
+        # has finished.
+        if isinstance(source, str) and source.startswith("s3://"):
+            output_path = (s3_path or source.rsplit("/", 1)[0]).rstrip("/") + "/output/"
+            job = FanoutJob(client, [source], output_path, **options)
+            input_urls = _s3_urls(source)
+        elif isinstance(source, (str, Path)):
+            job = FanoutJob.from_local(client, source, s3_path, 1, **options)
+            input_urls = read_urls(source)
+        else:
+            # Keep a copy of the input to join the output back to.
+            local_file = os.path.join(workdir, "urls.txt")
+            with open(local_file, "w", encoding="utf-8") as f:
+                for url in chain(head, rest):
+                    f.write(url.strip() + "\n")
+            job = FanoutJob.from_local(client, local_file, s3_path, 1, **options)
+            input_urls = _lines(local_file)
+        for state in job.run(**watch_kwargs):
+            logger.debug(f"Batch job {state.job_id}: {state.status}")
+        if job.failed:
+            raise BatchFailed(
+                "Batch job(s) did not complete: "
+                + ", ".join(f"{s.job_id} ({s.status})" for s in job.failed)
+            )
+        yield from join_results(
+            job.shards, input_urls, models, index_path=os.path.join(workdir, "index")
+        )
+
+
+def _lines(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\n")
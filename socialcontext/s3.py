@@ -0,0 +1,346 @@
+"""
+S3 helpers for reading batch job output.
+
+Set ``SOCIALCONTEXT_S3_ENDPOINT_URL`` to point at a local S3 stand-in such as
+moto server or MinIO.
+"""
+import bz2
+import gzip
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Tuple, Union
+
+from .constants import DEFAULT_MEMORY_BUDGET, DEFAULT_WORKERS
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".zst")
+
+# Assumed decompressed/compressed size ratio until one has been observed.
+INITIAL_EXPANSION = 4.0
+
+# Decompressed bytes read from a streamed part at a time.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_s3_resource = None
+
+
+def s3_resource():
+    import boto3
+
+    global _s3_resource
+    if _s3_resource is None:
+        _s3_resource = boto3.resource(
+            "s3", endpoint_url=os.environ.get("SOCIALCONTEXT_S3_ENDPOINT_URL")
+        )
+    return _s3_resource
+
+
+def s3_client():
+    resource = s3_resource()
+    return resource.meta.client
+
+
+def parse_path(path):
+    assert path.startswith("s3://"), f"Invalid s3 path: {path}"
+    bucket = path.split("/")[2]
+    key = "/".join(path.split("/")[3:]).strip("/")
+    return bucket, key
+
+
+def open_decompressed(key: str, fileobj: BinaryIO) -> BinaryIO:
+    """Wrap ``fileobj`` in a decompressing reader chosen by the key's suffix."""
+    if key.endswith(".gz"):
+        return gzip.GzipFile(None, "rb", fileobj=fileobj)
+    if key.endswith(".bz2"):
+        return bz2.BZ2File(fileobj, "rb")
+    if key.endswith(".zst"):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(
+            fileobj, read_across_frames=True
+        )
+    return fileobj
+
+
+def decompress(key: str, data: bytes) -> bytes:
+    """Decompress a whole part according to the key's suffix.
+
+    Multi-member gzip and multi-stream bz2/zstd files are fully decompressed.
+    """
+    if key.endswith(".gz"):
+        return gzip.decompress(data)
+    if key.endswith(".bz2"):
+        return bz2.decompress(data)
+    if key.endswith(".zst"):
+        return open_decompressed(key, BytesIO(data)).read()
+    return data
+
+
+def iterate_file(bucket, key, encoding="utf-8"):
+    obj = s3_resource().Object(bucket, key).get()["Body"]
+    for line in open_decompressed(key, obj):
+        yield line.decode(encoding).strip()
+
+
+def list_parts(bucket: str, prefix: str, file_type: str = "data") -> List[dict]:
+    """List output part objects named ``{file_type}-*`` under a prefix.
+
+    Pages through the full listing, so more than 1000 parts are supported.
+    Returns the S3 object summaries (``Key``, ``Size``, ``ETag``, ...) sorted
+    by key.
+    """
+    paginator = s3_client().get_paginator("list_objects_v2")
+    parts = []
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            name = item["Key"].split("/")[-1]
+            if name.startswith(f"{file_type}-"):
+                parts.append(item)
+    return sorted(parts, key=lambda item: item["Key"])
+
+
+def read_part(bucket: str, key: str) -> bytes:
+    """Read the raw (possibly compressed) bytes of a part object."""
+    return s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+
+
+def fetch_part(bucket: str, key: str) -> bytes:
+    """Read and decompress a part object."""
+    return decompress(key, read_part(bucket, key))
+
+
+def open_part(bucket: str, key: str) -> BinaryIO:
+    """Open a part object as a stream of decompressed bytes."""
+    body = s3_client().get_object(Bucket=bucket, Key=key)["Body"]
+    return open_decompressed(key, body)
+
+
+class _PartStream:
+    def __init__(self):
+        self.chunks = deque()
+        self.done = False
+        self.error = None
+
+
+def stream_parts(
+    bucket: str,
+    parts: List[dict],
+    *,
+    workers: int = DEFAULT_WORKERS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    open_part: Callable[[str, str], BinaryIO] = open_part,
+) -> Iterator[Tuple[dict, Iterator[bytes]]]:
+    """Yield ``(part, chunks)`` for each part, in order, streaming its bytes.
+
+    ``chunks`` yields the part's decompressed bytes ``chunk_size`` at a time
+    and must be consumed before moving to the next part. ``workers`` threads
+    read and decompress parts ahead of the consumer, while the chunks they
+    have buffered fit in ``memory_budget`` bytes. The part being consumed may
+    always buffer one chunk, and each worker holds at most one chunk while it
+    waits, so memory use stays within ``memory_budget`` plus a few chunks
+    however large the parts are.
+    """
+    streams = [_PartStream() for _ in parts]
+    cond = threading.Condition()
+    state = {"head": 0, "buffered": 0, "closed": False}
+
+    def produce(i, part):
+        stream = streams[i]
+        try:
+            with open_part(bucket, part["Key"]) as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    with cond:
+                        while not state["closed"] and (
+                            state["buffered"] + len(chunk) > memory_budget
+                            and not (i == state["head"] and not stream.chunks)
+                        ):
+                            cond.wait()
+                        if state["closed"]:
+                            return
+                        stream.chunks.append(chunk)
+                        state["buffered"] += len(chunk)
+                        cond.notify_all()
+        except Exception as e:
+            stream.error = e
+        finally:
+            with cond:
+                stream.done = True
+                cond.notify_all()
+
+    def consume(stream):
+        while True:
+            with cond:
+                while not stream.chunks and not stream.done:
+                    cond.wait()
+                if not stream.chunks:
+                    if stream.error is not None:
+                        raise stream.error
+                    return
+                chunk = stream.chunks.popleft()
+                state["buffered"] -= len(chunk)
+                cond.notify_all()
+            yield chunk
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for i, part in enumerate(parts):
+                executor.submit(produce, i, part)
+            for i, part in enumerate(parts):
+                with cond:
+                    state["head"] = i
+                    cond.notify_all()
+                yield part, consume(streams[i])
+                # Drain whatever the consumer left unread.
+                for _ in consume(streams[i]):
+                    pass
+        finally:
+            with cond:
+                state["closed"] = True
+                cond.notify_all()
+
+
+def prefetch_parts(
+    bucket: str,
+    parts: List[dict],
+    *,
+    workers: int = DEFAULT_WORKERS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    fetch: Callable[[str, str], bytes] = fetch_part,
+) -> Iterator[Tuple[dict, bytes]]:
+    """Yield ``(part, decompressed bytes)`` for each part, in order.
+
+    Parts are fetched and decompressed concurrently by ``workers`` threads;
+    zlib, bz2 and zstd release the GIL, so decompression runs in parallel
+    across parts. Fetches are only started while the estimated decompressed
+    size of fetched-but-unconsumed parts fits in ``memory_budget`` bytes (one
+    part is always allowed, however large). The size estimate scales each
+    part's listed size by the compression ratio observed so far. For
+    consumers that need whole parts; ``stream_parts`` bounds memory by
+    chunks instead.
+    """
+    pending = deque()
+    buffered = 0
+    compressed = expanded = 0
+    remaining = iter(parts)
+    upcoming = next(remaining, None)
+
+    def estimate(part):
+        if not part["Key"].endswith(COMPRESSED_SUFFIXES):
+            return part["Size"]
+        ratio = expanded / compressed if compressed else INITIAL_EXPANSION
+        return int(part["Size"] * ratio)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while upcoming is not None or pending:
+            while upcoming is not None and (
+                not pending or buffered + estimate(upcoming) <= memory_budget
+            ):
+                size = estimate(upcoming)
+                future = executor.submit(fetch, bucket, upcoming["Key"])
+                pending.append((upcoming, size, future))
+                buffered += size
+                upcoming = next(remaining, None)
+            part, size, future = pending.popleft()
+            data = future.result()
+            if part["Key"].endswith(COMPRESSED_SUFFIXES):
+                compressed += part["Size"]
+                expanded += len(data)
+            yield part, data
+            buffered -= size
+
+
+def write_parts(
+    parts: Iterator[Tuple[dict, Union[bytes, Iterable[bytes]]]],
+    sink: BinaryIO,
+    *,
+    first: bool = True,
+    on_part: Callable[[dict, int], None] = None,
+) -> int:
+    """Write parts to ``sink`` as one stream, keeping only the first header.
+
+    Each part's data is its bytes, or an iterable of chunks of them as
+    ``stream_parts`` gives. Works on bytes without splitting lines: the
+    header of each part after the first is skipped up to its first newline,
+    and each chunk is then written in one call. Pass ``first=False`` when
+    appending to existing output so that every part's header is skipped.
+    ``on_part`` is called with each part and the number of bytes written for
+    it. Returns the total number of bytes written.
+    """
+    written = 0
+    for df_i, (part, chunks) in enumerate(parts):
+        if isinstance(chunks, (bytes, bytearray)):
+            chunks = (chunks,)
+        skipping = df_i > 0 or not first  # skip headers after the first file
+        nbytes = 0
+        last = None
+        for chunk in chunks:
+            view = memoryview(chunk)
+            if skipping:
+                newline = chunk.find(b"\n")
+                if newline < 0:
+                    continue
+                view = view[newline + 1:]
+                skipping = False
+            if len(view):
+                sink.write(view)
+                nbytes += len(view)
+                last = view[-1]
+        if nbytes and last != 0x0A:
+            sink.write(b"\n")
+            nbytes += 1
+        written += nbytes
+        if on_part is not None:
+            on_part(part, nbytes)
+    return written
+
+
+def download_to_file(
+    bucket: str,
+    prefix: str,
+    output_file: Union[str, Path],
+    *,
+    file_type: str = "data",
+    workers: int = DEFAULT_WORKERS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    resume: bool = True,
+) -> int:
+    """Download a job's output parts into ``output_file``, resumably.
+
+    Progress is kept in a DownloadManifest next to the output file. With
+    ``resume``, unchanged parts already in the file are kept and only new or
+    changed parts (and any after them) are fetched. Returns the number of
+    parts fetched.
+    """
+    from .manifest import DownloadManifest
+
+    parts = list_parts(bucket, prefix, file_type)
+    manifest = DownloadManifest(output_file)
+    if not resume:
+        manifest.parts = []
+    index, offset = manifest.resume_point(f"s3://{bucket}/{prefix}#{file_type}", parts)
+    todo = parts[index:]
+    manifest.save()
+    mode = "r+b" if os.path.exists(output_file) else "wb"
+    with open(output_file, mode) as out:
+        out.seek(offset)
+        out.truncate()
+        position = offset
+
+        def record(part, nbytes):
+            nonlocal position
+            out.flush()
+            manifest.record(part, position, nbytes)
+            position += nbytes
+
+        streamed = stream_parts(
+            bucket, todo, workers=workers, memory_budget=memory_budget
+        )
+        write_parts(streamed, out, first=index == 0, on_part=record)
+    return len(todo)
@@ -0,0 +1,338 @@
+"""
+Local stand-in for the socialcontext.ai API, for testing and benchmarks.
+
+Implements the token, token-refresh, classify, models and jobs endpoints
+with configurable latency, error rate, 429 throttling and token lifetime.
+Classification scores are deterministic per (content, model). Jobs advance
+through ``scheduled``, ``running`` and ``completed`` as time passes.
+
+Run it standalone:
+
+    python -m socialcontext.standin --port 8000 --latency 0.05 --rate-limit 200
+
+or in-process:
+
+    with StandinServer(latency=0.01) as server:
+        client = SocialcontextClient(app_id, app_secret, api_root=server.url)
+
+The server speaks plain HTTP, so set ``OAUTHLIB_INSECURE_TRANSPORT=1`` for
+the token fetch, and ``SOCIALCONTEXT_API_ROOT`` to the server's URL before
+starting the CLI against it.
+"""
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .constants import VERSION
+
+DEFAULT_MODELS = [
+    "antivax",
+    "crime_violence",
+    "fake_news",
+    "military",
+    "political",
+    "provax",
+    "vice",
+]
+
+
+def score(content: str, model: str) -> float:
+    digest = hashlib.sha1(f"{model}|{content}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32
+
+
+class StandinServer:
+    """Threaded HTTP server emulating the socialcontext API.
+
+    ``latency`` seconds (plus up to ``jitter`` more) are added to each API
+    response. ``error_rate`` is the fraction of API requests answered with a
+    500. With ``rate_limit`` requests/sec, requests over the limit get a 429
+    with a Retry-After header. Tokens expire after ``token_ttl`` seconds.
+    ``job_duration`` is how long a scheduled job takes to complete.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = None,
+        token_ttl: float = 3600,
+        job_duration: float = 10.0,
+        models=DEFAULT_MODELS,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.job_duration = job_duration
+        self.models = list(models)
+        self.tokens = {}
+        self.jobs = {}
+        self.counts = {"requests": 0, "throttled": 0, "errors": 0, "tokens": 0}
+        self._lock = threading.Lock()
+        self._allowance = float(rate_limit or 0)
+        self._checked = time.monotonic()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Behaviour
+
+    def throttled(self) -> bool:
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(
+                self.rate_limit,
+                self._allowance + (now - self._checked) * self.rate_limit,
+            )
+            self._checked = now
+            if self._allowance < 1:
+                return True
+            self._allowance -= 1
+            return False
+
+    def issue_token(self) -> dict:
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self.tokens[token] = time.time() + self.token_ttl
+            self.counts["tokens"] += 1
+        return {
+            "access_token": token,
+            "token_type": "Bearer",
+            "expires_in": self.token_ttl,
+        }
+
+    def revoke_tokens(self) -> None:
+        """Invalidate every issued token, forcing clients to re-authenticate."""
+        with self._lock:
+            self.tokens.clear()
+
+    def authorized(self, header: str) -> bool:
+        if not header or not header.startswith("Bearer "):
+            return False
+        expires = self.tokens.get(header[len("Bearer "):])
+        return expires is not None and expires > time.time()
+
+    def job_view(self, job: dict) -> dict:
+        job = dict(job)
+        if job["scheduled_at"] is not None and job["status"] in ("scheduled", "running"):
+            progress = min(1.0, (time.time() - job["scheduled_at"]) / self.job_duration)
+            job["urls_processed"] = int(job["urls_total"] * progress)
+            job["status"] = "completed" if progress >= 1 else "running"
+        return job
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle's algorithm
+            # the body waits on the client's delayed ACK, adding ~40 ms.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, data=None, headers=None):
+                body = b"" if data is None else json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Encoding") == "gzip":
+                    import gzip
+
+                    body = gzip.decompress(body)
+                elif self.headers.get("Content-Encoding") == "deflate":
+                    import zlib
+
+                    body = zlib.decompress(body)
+                return body
+
+            def handle_any(self, method):
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                parts = parsed.path.strip("/").split("/")
+                body = self.read_body()
+                with server._lock:
+                    server.counts["requests"] += 1
+                if len(parts) < 2 or parts[0] != VERSION:
+                    return self.send_json(404, {"detail": "Not found"})
+                endpoint = parts[1]
+                if endpoint in ("token", "token-refresh") and method == "POST":
+                    return self.send_json(200, server.issue_token())
+                if server.throttled():
+                    with server._lock:
+                        server.counts["throttled"] += 1
+                    return self.send_json(
+                        429, {"detail": "Too many requests"}, {"Retry-After": "1"}
+                    )
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay:
+                    time.sleep(delay)
+                if not server.authorized(self.headers.get("Authorization")):
+                    return self.send_json(401, {"detail": "Not authenticated"})
+                if server.error_rate and random.random() < server.error_rate:
+                    with server._lock:
+                        server.counts["errors"] += 1
+                    return self.send_json(500, {"detail": "Internal server error"})
+                data = json.loads(body) if body else {}
+                if endpoint == "classify" and method == "POST":
+                    return self.classify(data)
+                if endpoint == "models" and method == "GET":
+                    return self.models()
+                if endpoint == "jobs":
+                    return self.jobs(method, parts[2] if len(parts) > 2 else None, data, query)
+                return self.send_json(404, {"detail": "Not found"})
+
+            def classify(self, data):
+                content = data.get("url") or data.get("text")
+                if not content:
+                    return self.send_json(400, {"detail": "url or text required"})
+                models = data.get("models") or []
+                unknown = [m for m in models if m not in server.models]
+                if unknown:
+                    return self.send_json(400, {"detail": f"Unknown models: {unknown}"})
+                source = {"url": data["url"]} if data.get("url") else {"text_length": len(content)}
+                return self.send_json(200, {
+                    "source": source,
+                    "classifications": {m: score(content, m) for m in models},
+                })
+
+            def models(self):
+                data = {"models": server.models}
+                etag = '"%s"' % hashlib.sha1(json.dumps(data).encode()).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send_json(304, headers={"ETag": etag})
+                return self.send_json(200, data, {"ETag": etag})
+
+            def jobs(self, method, job_id, data, query):
+                if job_id is None and method == "POST":
+                    job_id = uuid.uuid4().hex
+                    job = {
+                        "job_id": job_id,
+                        "status": "created",
+                        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "scheduled_at": None,
+                        "urls_processed": 0,
+                        "urls_total": int(query.get("urls_total", 10000)),
+                        **data,
+                    }
+                    server.jobs[job_id] = job
+                    return self.send_json(200, job)
+                if job_id is None and method == "GET":
+                    page = int(query.get("page", 1))
+                    size = int(query.get("page_size", 100))
+                    jobs = [server.job_view(j) for j in server.jobs.values()]
+                    if query.get("status"):
+                        jobs = [j for j in jobs if j["status"] == query["status"]]
+                    chunk = jobs[(page - 1) * size:page * size]
+                    more = page * size < len(jobs)
+                    return self.send_json(200, {"jobs": chunk, "next": page + 1 if more else None})
+                job = server.jobs.get(job_id)
+                if job is None:
+                    return self.send_json(404, {"detail": "Job not found"})
+                if method == "GET":
+                    view = server.job_view(job)
+                    etag = '"%s"' % hashlib.sha1(json.dumps(view).encode()).hexdigest()
+                    if self.headers.get("If-None-Match") == etag:
+                        return self.send_json(304, headers={"ETag": etag})
+                    return self.send_json(200, view, {"ETag": etag})
+                if method == "PUT":
+                    action = data.get("action")
+                    if action == "schedule":
+                        job.update(status="scheduled", scheduled_at=time.time())
+                    elif action == "cancel":
+                        job.update(server.job_view(job), status="cancelled")
+                    return self.send_json(200, server.job_view(job))
+                if method == "DELETE":
+                    del server.jobs[job_id]
+                    return self.send_json(200, {"job_id": job_id, "deleted": True})
+                return self.send_json(405, {"detail": "Method not allowed"})
+
+            def do_GET(self):
+                self.handle_any("GET")
+
+            def do_POST(self):
+                self.handle_any("POST")
+
+            def do_PUT(self):
+                self.handle_any("PUT")
+
+            def do_DELETE(self):
+                self.handle_any("DELETE")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in socialcontext API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--token-ttl", type=float, default=3600)
+    parser.add_argument("--job-duration", type=float, default=10.0)
+    args = parser.parse_args()
+    server = StandinServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        token_ttl=args.token_ttl,
+        job_duration=args.job_duration,
+    )
+    print(f"Serving stand-in socialcontext API at {server.url}/{VERSION}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Client-side preprocessing of text sent for classification.
+
+Long-form text is often HTML or copied from it. Stripping markup and page
+boilerplate, collapsing whitespace and truncating to what the models will
+read anyway can shrink request bodies considerably without changing results.
+"""
+import re
+from html.parser import HTMLParser
+from typing import Optional
+
+# Elements whose content is page furniture rather than article text.
+BOILERPLATE_TAGS = frozenset(
+    ["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"]
+)
+BLOCK_TAGS = frozenset(
+    ["p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+     "article", "section", "blockquote", "pre", "table", "ul", "ol"]
+)
+
+MARKUP = re.compile(r"<(?:[a-zA-Z][a-zA-Z0-9]*|/[a-zA-Z][a-zA-Z0-9]*|!--)[^>]*>")
+SPACES = re.compile(r"[^\S\n]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BOILERPLATE_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in BOILERPLATE_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.chunks.append(data)
+
+
+def strip_markup(text: str) -> str:
+    """Return the text content of an HTML fragment, without boilerplate elements.
+
+    Text without any markup is returned unchanged.
+    """
+    if not MARKUP.search(text):
+        return text
+    parser = _TextExtractor()
+    parser.feed(text)
+    parser.close()
+    return "".join(parser.chunks)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces and blank lines, and strip each line."""
+    text = SPACES.sub(" ", text.replace("\r\n", "\n").replace("\r", "\n"))
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return BLANK_LINES.sub("\n\n", text).strip()
+
+
+def truncate(text: str, max_length: int) -> str:
+    """Cut ``text`` to at most ``max_length`` characters, at a word boundary if one is near."""
+    if len(text) <= max_length:
+        return text
+    cut = text[:max_length]
+    boundary = max(cut.rfind(" "), cut.rfind("\n"))
+    if boundary >= max_length * 0.9:
+        cut = cut[:boundary]
+    return cut.rstrip()
+
+
+def preprocess_text(text: str, max_length: Optional[int] = None) -> str:
+    """Strip markup and boilerplate, normalize whitespace and truncate."""
+    text = normalize_whitespace(strip_markup(text))
+    if max_length:
+        text = truncate(text, max_length)
+    return text
@@ -0,0 +1,176 @@
+"""
+API token management.
+
+Keeps the decrypted token and the Fernet instance for its encrypted store in
+memory, refreshes the token shortly before it expires, and makes sure that
+concurrent callers share a single refresh.
+
+Tokens are stored encrypted in the user cache directory, one file per app
+and API root, and shared between processes. Writes are atomic, and fetching a token is
+done under an advisory file lock, so when many processes need a token at
+once one of them fetches it and the rest wait for and reuse it.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from .constants import API_ROOT
+from .paths import cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: locking is per process only.
+    fcntl = None
+
+logger = logging.getLogger("socialcontext")
+
+# Refresh this many seconds before the token's expires_at.
+DEFAULT_LEEWAY = 60
+
+
+def make_fernet(key: str) -> Fernet:
+    key = key + "=" * (len(key) % 4)
+    _key = base64.urlsafe_b64encode(base64.urlsafe_b64decode(key))
+    return Fernet(_key)
+
+
+def token_path(app_id: str, api_root: str = API_ROOT) -> Path:
+    # Tokens for the default API root keep the name they had before roots
+    # could be chosen per client.
+    key = app_id if api_root == API_ROOT else f"{api_root}#{app_id}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    directory = cache_dir() / "tokens"
+    directory.mkdir(mode=0o700, exist_ok=True)
+    return directory / f"{digest}.token"
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive advisory lock on ``path`` for the duration."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class TokenManager:
+    """In-memory token holder backed by an encrypted token file.
+
+    ``fetch`` is called with no arguments to obtain a new token. It is only
+    ever run by one thread, in one process, at a time; other threads and
+    processes needing a token wait for it and reuse the result.
+    """
+
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        fetch: Callable[[], dict],
+        *,
+        leeway: float = DEFAULT_LEEWAY,
+        api_root: str = API_ROOT,
+    ):
+        self.app_id = app_id
+        self.fetch = fetch
+        self.leeway = leeway
+        self.fernet = make_fernet(app_secret)
+        self.path = token_path(app_id, api_root)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._token = None
+        self._lock = threading.Lock()
+
+    # Persistent store
+
+    def load(self) -> dict:
+        """Load the saved token. Raises KeyError if there is none."""
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(self.fernet.decrypt(f.read()))
+        except (OSError, InvalidToken, ValueError):
+            raise KeyError(self.app_id)
+
+    def save(self, token: dict) -> None:
+        """Persist ``token`` and make it the current in-memory token."""
+        logger.debug("Saving token for %s", self.app_id)
+        _t = self.fernet.encrypt(json.dumps(token).encode())
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_t)
+        os.replace(tmp, self.path)
+        self._token = token
+
+    def clear(self) -> None:
+        self._token = None
+        with file_lock(self.lock_path):
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+
+    # Token access
+
+    def expiring(self, token: dict) -> bool:
+        expires_at = token.get("expires_at")
+        if expires_at is None:
+            return False
+        return time.time() >= float(expires_at) - self.leeway
+
+    def get(self) -> dict:
+        """Return a valid token, refreshing it first if it is about to expire."""
+        token = self._token
+        if token is None or self.expiring(token):
+            token = self.refresh(stale=token)
+        return token
+
+    def _usable(self, token: Optional[dict], stale: Optional[dict]) -> bool:
+        if token is None or self.expiring(token):
+            return False
+        return stale is None or token.get("access_token") != stale.get("access_token")
+
+    def _load_usable(self, stale: Optional[dict]) -> Optional[dict]:
+        try:
+            token = self.load()
+        except KeyError:
+            return None
+        if self._usable(token, stale):
+            self._token = token
+            return token
+        return None
+
+    def refresh(self, stale: Optional[dict] = None) -> dict:
+        """Replace the ``stale`` token, unless another caller already has.
+
+        ``stale`` is the token the caller saw expire or get rejected. Callers
+        that arrive while a refresh is running, in this or another process,
+        block until it finishes and then return the new token without
+        fetching again.
+        """
+        with self._lock:
+            token = self._token
+            if token is not None and token is not stale and not self.expiring(token):
+                return token
+            # Another process may already have saved a newer token.
+            token = self._load_usable(stale)
+            if token is not None:
+                return token
+            with file_lock(self.lock_path):
+                token = self._load_usable(stale)
+                if token is not None:
+                    return token
+                token = self.fetch()
+                self.save(token)
+                return token
@@ -0,0 +1,261 @@
+"""
+On-disk index from URL to result row of completed batch job output.
+
+An index is a directory of three files:
+
+- ``records.csv``: each indexed output row, prefixed with the number of the
+  CSV header it belongs to, appended as parts are added.
+- ``table.bin``: an open-addressing hash table of 64-bit URL hashes and
+  record offsets, with linear probing, memory-mapped for lookups.
+- ``meta.json``: the CSV headers and the parts (key and ETag) indexed.
+
+Parts can be added to an existing index at any time; a URL seen again points
+to its latest row. Lookups hash the normalized URL, probe the table and read
+one row, so they take microseconds regardless of the index size.
+"""
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .cache import normalize_url
+from .constants import DEFAULT_MEMORY_BUDGET, DEFAULT_WORKERS
+
+MAGIC = b"SCURLIX1"
+HEADER = struct.Struct("<8sQQ")
+SLOT = struct.Struct("<QQ")
+TABLE_OFFSET = 32
+INITIAL_CAPACITY = 1 << 16
+MAX_LOAD = 0.7
+
+# Output columns that are not model scores.
+NON_SCORE_COLUMNS = ("url", "domain")
+
+
+def key_hash(key: str) -> int:
+    """64-bit hash of a normalized URL; never 0, which marks empty slots."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def row_result(header: List[str], row: List[str], models: List[str] = None) -> dict:
+    """Convert an output CSV row into a classify-style result dict.
+
+    Score columns, those named in ``models`` or all but the url and domain
+    columns if no models are given, are collected as floats under
+    ``classifications``; the other columns are kept as they are.
+    """
+    result, scores = {}, {}
+    for name, value in zip(header, row):
+        if (name in models) if models else (name not in NON_SCORE_COLUMNS):
+            try:
+                scores[name] = float(value)
+            except (TypeError, ValueError):
+                scores[name] = None
+        else:
+            result[name] = value
+    result["classifications"] = scores
+    return result
+
+
+class URLIndex:
+    """A URL index directory, opened for lookups and for adding parts."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.records_path = self.path / "records.csv"
+        self.table_path = self.path / "table.bin"
+        self.meta_path = self.path / "meta.json"
+        self.headers = []
+        self.parts = {}
+        if self.meta_path.exists():
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            self.headers = meta.get("headers", [])
+            self.parts = meta.get("parts", {})
+        if not self.table_path.exists():
+            self._create_table(self.table_path, INITIAL_CAPACITY)
+        self.records_path.touch()
+        self._records = open(self.records_path, "ab")
+        self._records_map = None
+        self._open_table()
+
+    # Storage
+
+    def _create_table(self, path: Path, capacity: int) -> None:
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, capacity, 0).ljust(TABLE_OFFSET, b"\0"))
+            f.truncate(TABLE_OFFSET + capacity * SLOT.size)
+
+    def _open_table(self) -> None:
+        self._table_file = open(self.table_path, "r+b")
+        self._table = mmap.mmap(self._table_file.fileno(), 0)
+        magic, self.capacity, self.count = HEADER.unpack_from(self._table, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.table_path} is not a URL index table")
+
+    def _close_table(self) -> None:
+        HEADER.pack_into(self._table, 0, MAGIC, self.capacity, self.count)
+        self._table.flush()
+        self._table.close()
+        self._table_file.close()
+
+    def _save_meta(self) -> None:
+        tmp = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"headers": self.headers, "parts": self.parts}, f)
+        os.replace(tmp, self.meta_path)
+
+    def _record_at(self, offset: int) -> bytes:
+        if self._records_map is None or offset >= len(self._records_map):
+            self._records.flush()
+            if self._records_map is not None:
+                self._records_map.close()
+            with open(self.records_path, "rb") as f:
+                self._records_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = self._records_map.find(b"\n", offset)
+        return self._records_map[offset:end if end >= 0 else len(self._records_map)]
+
+    def _read(self, offset: int) -> Tuple[List[str], List[str]]:
+        fields = next(csv.reader([self._record_at(offset).decode("utf-8")]))
+        return self.headers[int(fields[0])], fields[1:]
+
+    # Hash table
+
+    def _probe(self, key: str):
+        """Find the slot for normalized URL ``key``.
+
+        Returns ``(slot position, header, row)``; header and row are None if
+        the URL is not indexed, and the position is then that of a free slot.
+        """
+        h = key_hash(key)
+        mask = self.capacity - 1
+        i = h & mask
+        while True:
+            position = TABLE_OFFSET + i * SLOT.size
+            slot_hash, slot_offset = SLOT.unpack_from(self._table, position)
+            if slot_offset == 0:
+                return position, None, None
+            if slot_hash == h:
+                header, row = self._read(slot_offset - 1)
+                if normalize_url(row[header.index("url")]) == key:
+                    return position, header, row
+            i = (i + 1) & mask
+
+    def _insert(self, url: str, offset: int) -> None:
+        if (self.count + 1) > self.capacity * MAX_LOAD:
+            self._grow()
+        key = normalize_url(url)
+        position, header, _ = self._probe(key)
+        if header is None:
+            self.count += 1
+        SLOT.pack_into(self._table, position, key_hash(key), offset + 1)
+
+    def _grow(self) -> None:
+        capacity = self.capacity * 2
+        tmp = self.table_path.with_name(self.table_path.name + ".tmp")
+        self._create_table(tmp, capacity)
+        mask = capacity - 1
+        with open(tmp, "r+b") as f, mmap.mmap(f.fileno(), 0) as table:
+            for i in range(self.capacity):
+                h, offset = SLOT.unpack_from(self._table, TABLE_OFFSET + i * SLOT.size)
+                if not offset:
+                    continue
+                j = h & mask
+                while SLOT.unpack_from(table, TABLE_OFFSET + j * SLOT.size)[1]:
+                    j = (j + 1) & mask
+                SLOT.pack_into(table, TABLE_OFFSET + j * SLOT.size, h, offset)
+            HEADER.pack_into(table, 0, MAGIC, capacity, self.count)
+        self._close_table()
+        os.replace(tmp, self.table_path)
+        self._open_table()
+
+    # Adding output
+
+    def has_part(self, part: dict) -> bool:
+        return self.parts.get(part["Key"]) == part["ETag"]
+
+    def add_part(self, part: dict, data: bytes) -> int:
+        """Index the rows of one decompressed output part. Returns the row count."""
+        lines = BytesIO(data)
+        header = next(csv.reader([lines.readline().decode("utf-8")]), None)
+        if not header or "url" not in header:
+            return 0
+        if header not in self.headers:
+            self.headers.append(header)
+        header_id = self.headers.index(header)
+        url_column = header.index("url")
+        prefix = f"{header_id},".encode("utf-8")
+        offset = self._records.tell()
+        rows = 0
+        for line in lines:
+            line = line.rstrip(b"\r\n")
+            if not line:
+                continue
+            row = next(csv.reader([line.decode("utf-8")]))
+            if len(row) <= url_column or not row[url_column]:
+                continue
+            self._records.write(prefix + line + b"\n")
+            self._insert(row[url_column], offset)
+            offset += len(prefix) + len(line) + 1
+            rows += 1
+        self._records.flush()
+        HEADER.pack_into(self._table, 0, MAGIC, self.capacity, self.count)
+        self._table.flush()
+        self.parts[part["Key"]] = part["ETag"]
+        self._save_meta()
+        return rows
+
+    def build(
+        self,
+        bucket: str,
+        prefix: str,
+        *,
+        workers: int = DEFAULT_WORKERS,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    ) -> Iterator[Tuple[dict, int]]:
+        """Index the ``data-*`` parts under an S3 prefix not yet in the index.
+
+        Parts already indexed with the same ETag are skipped. Yields each
+        added part and its row count.
+        """
+        from .s3 import list_parts, prefetch_parts
+
+        parts = [p for p in list_parts(bucket, prefix, "data") if not self.has_part(p)]
+        for part, data in prefetch_parts(
+            bucket, parts, workers=workers, memory_budget=memory_budget
+        ):
+            yield part, self.add_part(part, data)
+
+    # Lookups
+
+    def lookup(self, url: str, models: List[str] = None) -> Optional[dict]:
+        """Return the result for ``url``, as ``row_result`` gives it, or None."""
+        _, header, row = self._probe(normalize_url(url))
+        if header is None:
+            return None
+        return row_result(header, row, models)
+
+    def lookup_many(self, urls: Iterable[str], models: List[str] = None) -> Dict[str, Optional[dict]]:
+        return {url: self.lookup(url, models) for url in urls}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._close_table()
+        self._records.close()
+        if self._records_map is not None:
+            self._records_map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
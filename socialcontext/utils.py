@@ -1,27 +1,66 @@
+import csv
 import json
 import os
+import sys
+import textwrap
+import time
 from enum import Enum
-from pathlib import Path
-from .api import SocialcontextClient, VERSION
+from typing import List
+import typer
+from .registry import get_registry
 
 
 BATCHES_BUCKET = "socialcontext-batches"
-MODELS_CACHE = Path(__file__).parent / ".models"
-
-app_id = os.environ["SOCIALCONTEXT_APP_ID"]
-app_secret = os.environ["SOCIALCONTEXT_APP_SECRET"]
 
 
 _client = None
 
+# Request hooks given to the CLI's client.
+_hooks = []
+
 
 def client():
+    """Return the CLI's shared client, created on first use.
+
+    The API client and its dependencies are imported here rather than at
+    module load so that commands which never reach the API start quickly.
+    """
     global _client
     if _client is None:
-        _client = SocialcontextClient(app_id, app_secret)
+        from .api import SocialcontextClient
+
+        try:
+            app_id = os.environ["SOCIALCONTEXT_APP_ID"]
+            app_secret = os.environ["SOCIALCONTEXT_APP_SECRET"]
+        except KeyError as e:
+            typer.echo(
+                typer.style(
+                    f"The {e.args[0]} environment variable must be set.",
+                    fg=typer.colors.RED,
+                    bold=True,
+                ),
+                err=True,
+            )
+            raise typer.Exit(code=1)
+        _client = SocialcontextClient(app_id, app_secret, hooks=_hooks)
     return _client
 
 
+def enable_timings(ctx: typer.Context):
+    """Collect request timings and print a breakdown when the command ends."""
+    from .metrics import MetricsCollector
+
+    collector = MetricsCollector()
+    _hooks.append(collector)
+    start = time.perf_counter()
+
+    def report():
+        typer.echo(collector.summary(), err=True)
+        typer.echo(f"command total {(time.perf_counter() - start) * 1000:.1f} ms", err=True)
+
+    ctx.call_on_close(report)
+
+
 class ContentTypes(str, Enum):
     news = "news"
 
@@ -32,30 +71,118 @@ def complete_content_type(incomplete: str):
             yield (name, help_text)
 
 
-def output(data, *, filename=None, indent=4):
+class OutputFormats(str, Enum):
+    json = "json"
+    jsonl = "jsonl"
+    csv = "csv"
+
+
+def format_option():
+    return typer.Option(
+        "json",
+        "--format",
+        help="Output format: json, jsonl (one record per line) or csv.",
+    )
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data) -> str:
+    """Compact JSON encoding, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False)
+
+
+def output(data, *, filename=None, indent=4, format=OutputFormats.json):
+    if format != OutputFormats.json:
+        records = data if isinstance(data, list) else [data]
+        output_records(records, filename=filename, format=format)
+        return
     if filename is None:
-        s = json.dumps(data, indent=indent, ensure_ascii=False).encode("utf-8")
-        print(s.decode())
+        print(json.dumps(data, indent=indent, ensure_ascii=False))
     if filename is not None:
         with open(filename, "w", encoding="utf8") as f:
             json.dump(data, f, indent=indent, ensure_ascii=False)
 
 
-def cache_models():
-    r = client().models().json()
-    with open(MODELS_CACHE, 'w') as f:
-        json.dump(r, f)
-    return r
+def output_records(records, *, filename=None, indent=4, format=OutputFormats.json, key=None):
+    """Write records one at a time as they are produced.
+
+    ``json`` writes a JSON array, or with ``key`` an object holding the array
+    under that key, ``jsonl`` one compact JSON object per line, and ``csv`` a
+    header from the first record's keys followed by one row per record, with
+    nested values JSON-encoded.
+    """
+    f = open(filename, "w", encoding="utf8", newline="") if filename else sys.stdout
+    try:
+        if format == OutputFormats.jsonl:
+            for record in records:
+                f.write(dumps(record))
+                f.write("\n")
+        elif format == OutputFormats.csv:
+            writer = None
+            for record in records:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(record), extrasaction="ignore")
+                    writer.writeheader()
+                writer.writerow({
+                    k: dumps(v) if isinstance(v, (dict, list)) else v
+                    for k, v in record.items()
+                })
+        else:
+            # Formatted as json.dumps(..., indent=indent) formats the whole.
+            outer = " " * indent if key is not None else ""
+            if key is not None:
+                f.write("{\n" + outer + json.dumps(key) + ": ")
+            f.write("[")
+            count = 0
+            for count, record in enumerate(records, 1):
+                f.write(",\n" if count > 1 else "\n")
+                text = json.dumps(record, indent=indent, ensure_ascii=False)
+                f.write(textwrap.indent(text, outer + " " * indent, lambda line: True))
+            f.write("\n" + outer + "]" if count else "]")
+            f.write("\n}\n" if key is not None else "\n")
+    finally:
+        if filename:
+            f.close()
 
 
-_models = None
-def Models():
-    """Return an enum of supported models from the models cache."""
-    global _models
-    if _models is None:
-        try:
-            with open(MODELS_CACHE) as f:
-                _models = json.load(f)["models"]
-        except:
-            _models = cache_models()["models"]
-    return Enum("Models", { m:m for m in _models })
+def cache_models():
+    """Fetch the current model list into the model registry and return it."""
+    return client().registry().get(client(), refresh=True)
+
+
+def model_names() -> List[str]:
+    """Return the supported model names from the model registry."""
+    return client().registry().names(client())
+
+
+def validate_models(models: List[str]) -> List[str]:
+    """Typer callback checking model arguments against the supported models.
+
+    Runs when a command is invoked, so the model list is only loaded (and
+    fetched, if not cached) by commands that take models. The check is
+    skipped if the client does not validate models, or if the model list
+    cannot be fetched.
+    """
+    if not models or not client().validate_models:
+        return models
+    registry = client().registry()
+    unknown = registry.unknown(client(), models)
+    if unknown:
+        raise typer.BadParameter(
+            f"Unknown model(s): {', '.join(unknown)}. "
+            f"Choose from: {', '.join(registry.names(client()))}"
+        )
+    return models
+
+
+def complete_model(incomplete: str):
+    """Complete model names from the model registry cache, without network access."""
+    names = get_registry().cached_names() or []
+    return [name for name in names if name.startswith(incomplete)]
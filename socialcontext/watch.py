@@ -0,0 +1,147 @@
+"""
+Monitoring of running batch jobs.
+
+A JobWatcher polls any number of jobs through one client (and so one
+session), adapting each job's polling interval to how quickly it is
+progressing, and using conditional requests when the API returns an ETag.
+"""
+import time
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+from .constants import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, TERMINAL_STATUSES
+
+PROCESSED_FIELDS = ("urls_processed", "processed_count", "processed", "count")
+TOTAL_FIELDS = ("urls_total", "total_urls", "url_count", "total")
+
+DEFAULT_WINDOW = 10
+
+
+def job_status(info: dict) -> Optional[str]:
+    """Return the lowercased status from a job info response."""
+    status = info.get("status")
+    if status is None and isinstance(info.get("job"), dict):
+        status = info["job"].get("status")
+    return status.lower() if isinstance(status, str) else status
+
+
+def _job_field(info: dict, names) -> Optional[int]:
+    for data in (info, info.get("job") if isinstance(info.get("job"), dict) else {}):
+        for name in names:
+            value = data.get(name)
+            if isinstance(value, (int, float)):
+                return int(value)
+    return None
+
+
+def job_progress(info: dict):
+    """Return ``(processed, total)`` URL counts from a job info response.
+
+    Either may be None if the response does not include it.
+    """
+    return _job_field(info, PROCESSED_FIELDS), _job_field(info, TOTAL_FIELDS)
+
+
+class JobState:
+    """Latest known state of one watched job."""
+
+    def __init__(self, job_id: str, window: int = DEFAULT_WINDOW):
+        self.job_id = job_id
+        self.info = {}
+        self.etag = None
+        self.status = None
+        self.processed = None
+        self.total = None
+        self.interval = DEFAULT_MIN_INTERVAL
+        self.next_poll = 0.0
+        self.samples = deque(maxlen=window)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Rolling URLs/sec over the recent samples."""
+        if len(self.samples) < 2:
+            return None
+        (t0, n0), (t1, n1) = self.samples[0], self.samples[-1]
+        if t1 <= t0:
+            return None
+        return (n1 - n0) / (t1 - t0)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until all URLs are processed."""
+        rate = self.rate
+        if not rate or self.total is None or self.processed is None:
+            return None
+        return max(0.0, (self.total - self.processed) / rate)
+
+    def update(self, info: dict, now: float) -> bool:
+        """Apply a fresh job info response. Returns True if progress was made."""
+        self.info = info
+        self.status = job_status(info)
+        processed, self.total = job_progress(info)
+        progressed = processed is not None and processed != self.processed
+        self.processed = processed
+        if processed is not None:
+            self.samples.append((now, processed))
+        return progressed
+
+
+class JobWatcher:
+    """Poll a set of jobs until all of them reach a terminal status.
+
+    Each job is polled at its own interval, between ``min_interval`` and
+    ``max_interval`` seconds: the interval is halved when a poll shows
+    progress and grown by half when it does not.
+    """
+
+    def __init__(
+        self,
+        client,
+        job_ids: Iterable[str],
+        *,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        window: int = DEFAULT_WINDOW,
+    ):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.states = {job_id: JobState(job_id, window) for job_id in job_ids}
+        for state in self.states.values():
+            state.interval = min_interval
+
+    def poll(self, state: JobState) -> JobState:
+        now = time.monotonic()
+        headers = {"If-None-Match": state.etag} if state.etag else None
+        r = self.client.jobs(job_id=state.job_id, headers=headers)
+        if r.status_code == 304:
+            progressed = False
+        else:
+            r.raise_for_status()
+            state.etag = r.headers.get("ETag")
+            progressed = state.update(r.json(), now)
+        if progressed:
+            state.interval = max(self.min_interval, state.interval / 2)
+        else:
+            state.interval = min(self.max_interval, state.interval * 1.5)
+        state.next_poll = now + state.interval
+        return state
+
+    def watch(self) -> Iterator[JobState]:
+        """Poll jobs as they come due, yielding each job's state after a poll.
+
+        Returns once every watched job has finished.
+        """
+        while True:
+            active = [s for s in self.states.values() if not s.finished]
+            if not active:
+                return
+            state = min(active, key=lambda s: s.next_poll)
+            delay = state.next_poll - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield self.poll(state)
@@ -0,0 +1,54 @@
+import base64
+import os
+
+import pytest
+
+from socialcontext.standin import StandinServer
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep tokens and cached results out of the user's cache directory."""
+    path = tmp_path / "cache"
+    monkeypatch.setenv("SOCIALCONTEXT_CACHE_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def app_secret():
+    return base64.urlsafe_b64encode(os.urandom(32)).decode()
+
+
+@pytest.fixture
+def standin():
+    with StandinServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(standin, app_secret, monkeypatch):
+    pytest.importorskip("requests")
+    pytest.importorskip("requests_oauthlib")
+    monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+    from socialcontext.api import SocialcontextClient
+
+    return SocialcontextClient("test", app_secret, api_root=standin.url)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """A mocked S3 with an empty ``bucket``; yields the boto3 client."""
+    moto = pytest.importorskip("moto")
+    pytest.importorskip("boto3")
+    from socialcontext import s3 as s3_module
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("SOCIALCONTEXT_S3_ENDPOINT_URL", raising=False)
+    monkeypatch.setattr(s3_module, "_s3_resource", None)
+    mock = getattr(moto, "mock_aws", None) or moto.mock_s3
+    with mock():
+        client = s3_module.s3_client()
+        client.create_bucket(Bucket="bucket")
+        yield client
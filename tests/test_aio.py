@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from socialcontext.aio import AsyncSocialcontextClient
+from socialcontext.standin import score
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_classify_many_takes_models_second(standin, app_secret):
+    urls = [f"https://example.com/{i}" for i in range(5)]
+
+    async def main():
+        async with AsyncSocialcontextClient("test", app_secret, api_root=standin.url) as client:
+            return await client.classify_many(urls, ["vice"], concurrency=2)
+
+    results = run(main())
+    assert [r["classifications"] for r in results] == [
+        {"vice": score(url, "vice")} for url in urls
+    ]
+
+
+def test_bad_request_does_not_reauthenticate(standin, app_secret):
+    async def main():
+        async with AsyncSocialcontextClient("test", app_secret, api_root=standin.url) as client:
+            r = await client.classify("news", models=["nonexistent"], url="https://example.com/")
+            assert r.status_code == 400
+            standin.revoke_tokens()
+            r = await client.classify("news", models=["vice"], url="https://example.com/")
+            assert r.status_code == 200
+
+    run(main())
+    # One token at the start and one after the revocation, none for the 400.
+    assert standin.counts["tokens"] == 2
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("typer")
+
+from socialcontext.analyze import analyze_parts, summary_records
+from socialcontext.utils import dumps
+
+
+def test_result_is_plain_json():
+    part = ["url,domain,vice,antivax", "https://a.com/1,a.com,0.9,0.1", "https://a.com/2,a.com,0.2,"]
+    result = analyze_parts([part], thresholds=[0.5])
+
+    stats = result["thresholds"]["0.5"]
+    assert stats["blocked"] == 1
+    assert stats["block_rate"] == 0.5
+    assert type(stats["block_rate"]) is float
+    assert type(stats["models"]["vice"]["block_rate"]) is float
+    # utils.dumps uses orjson when installed, which rejects numpy scalars.
+    for record in summary_records(result):
+        assert json.loads(dumps(record))["model"] in ("vice", "antivax")
+    assert json.loads(dumps(result))["rows"] == 2
+
+
+def test_cli_analyzes_every_s3_folder(s3, tmp_path):
+    from typer.testing import CliRunner
+
+    from socialcontext import cli
+
+    for job in ("job1", "job2"):
+        body = f"url,domain,vice\nhttps://a.com/{job},a.com,0.9\nhttps://b.com/{job},b.com,0.1\n"
+        s3.put_object(Bucket="bucket", Key=f"{job}/data-0000.csv", Body=body.encode("utf-8"))
+    runner = CliRunner()
+
+    result = runner.invoke(cli.app, ["analyze", "s3://bucket/job1/", "s3://bucket/job2/"])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["rows"] == 4
+
+    local = tmp_path / "job3.csv"
+    local.write_text("url,domain,vice\nhttps://c.com/1,c.com,0.5\n")
+    result = runner.invoke(cli.app, ["analyze", "s3://bucket/job1/", str(local)])
+
+    assert result.exit_code == 1
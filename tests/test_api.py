@@ -0,0 +1,115 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("requests_oauthlib")
+
+from socialcontext import cache as cache_module
+from socialcontext.api import InvalidRequest, SocialcontextClient
+from socialcontext.cache import ResultCache
+from socialcontext.retry import RetryPolicy
+from socialcontext.standin import score
+
+
+def test_api_root_is_per_client(client, standin):
+    assert client.TOKEN_URL == f"{standin.url}/v1/token"
+    assert SocialcontextClient.TOKEN_URL != client.TOKEN_URL
+    assert standin.counts["tokens"] == 1
+
+    r = client.classify("news", models=["vice"], url="https://example.com/")
+
+    assert r.status_code == 200
+    assert r.json()["classifications"] == {"vice": score("https://example.com/", "vice")}
+
+
+def test_tokens_stored_per_api_root(client, standin, app_secret):
+    other = SocialcontextClient("test", app_secret, api_root=standin.url + "/")
+    assert other.tokens.path == client.tokens.path
+    assert standin.counts["tokens"] == 1
+
+
+def test_model_check_skipped_when_model_list_unavailable(client, standin):
+    client.retry = RetryPolicy(max_retries=0)
+    standin.error_rate = 1.0
+
+    client.check_models(["nonexistent"])
+
+    assert client.registry().data is None
+    standin.error_rate = 0.0
+    with pytest.raises(InvalidRequest):
+        client.check_models(["nonexistent"])
+    client.check_models(["vice"])
+
+
+def test_standin_responds_without_delayed_ack_stall(client):
+    import time
+
+    client.classify("news", models=["vice"], url="https://example.com/")
+    start = time.perf_counter()
+    for i in range(20):
+        client.classify("news", models=["vice"], url=f"https://example.com/{i}")
+    # With Nagle's algorithm on, each response stalls ~40 ms.
+    assert (time.perf_counter() - start) / 20 < 0.02
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_cache_serves_partial_hits(client, standin, tmp_path):
+    client.cache = ResultCache(tmp_path / "cache.sqlite3")
+    url = "https://example.com/"
+    client.classify("news", models=["vice"], url=url)
+    requests = standin.counts["requests"]
+
+    r = client.classify("news", models=["vice", "antivax"], url=url)
+
+    assert r.json()["classifications"] == {m: score(url, m) for m in ("vice", "antivax")}
+    assert standin.counts["requests"] == requests + 1
+    assert client.cache.stats()["partial_hits"] == 1
+
+    r = client.classify("news", models=["antivax", "vice"], url=url)
+
+    assert r.json()["classifications"] == {m: score(url, m) for m in ("vice", "antivax")}
+    assert standin.counts["requests"] == requests + 1
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_cache_ignores_expired_entries(tmp_path, clock):
+    cache = ResultCache(tmp_path / "cache.sqlite3", ttl=60)
+    cache.put("a", {"url": "a"}, {"vice": 0.5})
+    clock.now += 30
+    cache.put("a", {"url": "a"}, {"antivax": 0.1})
+
+    clock.now += 40
+
+    assert cache.get("a", ["vice", "antivax"]) == ({"antivax": 0.1}, {"url": "a"})
+    clock.now += 30
+    assert cache.get("a", ["vice", "antivax"]) == ({}, None)
+    assert cache.stats() == {"hits": 0, "partial_hits": 1, "misses": 1}
+
+
+def test_cache_evicts_least_recently_used(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(cache_module, "EVICT_EVERY", 1)
+    cache = ResultCache(tmp_path / "cache.sqlite3", max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, {"url": key}, {"vice": 0.5})
+        clock.now += 1
+    cache.get("a", ["vice"])
+    clock.now += 1
+
+    cache.put("c", {"url": "c"}, {"vice": 0.5})
+
+    assert cache.get("a", ["vice"])[0] == {"vice": 0.5}
+    assert cache.get("b", ["vice"]) == ({}, None)
+    assert cache.get("c", ["vice"])[0] == {"vice": 0.5}
@@ -0,0 +1,64 @@
+import json
+
+from socialcontext.checkpoint import ClassifyCheckpoint
+
+
+def write_records(path, records):
+    with open(path, "ab") as f:
+        for record in records:
+            f.write(json.dumps(record).encode("utf-8") + b"\n")
+
+
+def test_failed_line_does_not_pin_low_water_mark(tmp_path):
+    checkpoint = ClassifyCheckpoint(tmp_path / "out.jsonl")
+    checkpoint.resume("source")
+    checkpoint.mark(0, failed=True)
+    for index in range(1, 1000):
+        checkpoint.mark(index)
+
+    assert checkpoint.low == 1000
+    assert checkpoint.done == set()
+    assert checkpoint.failed == {0}
+    assert not checkpoint.finished(0)
+    assert checkpoint.finished(1)
+    assert checkpoint.count == 999
+
+    checkpoint.mark(0)
+
+    assert checkpoint.failed == set()
+    assert checkpoint.finished(0)
+    assert checkpoint.count == 1000
+
+
+def test_resume_reads_back_records_after_offset(tmp_path):
+    output = tmp_path / "out.jsonl"
+    checkpoint = ClassifyCheckpoint(output)
+    checkpoint.resume("source")
+    write_records(output, [{"index": 0, "url": "a"}])
+    checkpoint.mark(0)
+    checkpoint.save(output.stat().st_size)
+    # Written after the last checkpoint, then interrupted mid-record.
+    write_records(output, [{"index": 2, "url": "c"}, {"index": 1, "url": "b", "error": "500"}])
+    with open(output, "ab") as f:
+        f.write(b'{"index": 3')
+
+    resumed = ClassifyCheckpoint(output)
+    offset = resumed.resume("source")
+
+    assert offset == output.stat().st_size - len(b'{"index": 3')
+    assert [resumed.finished(i) for i in range(4)] == [True, False, True, False]
+    assert resumed.failed == {1}
+    assert resumed.count == 2
+
+
+def test_resume_other_source_starts_over(tmp_path):
+    output = tmp_path / "out.jsonl"
+    checkpoint = ClassifyCheckpoint(output)
+    checkpoint.resume("source")
+    checkpoint.mark(0, failed=True)
+    checkpoint.save(0)
+
+    resumed = ClassifyCheckpoint(output)
+    assert resumed.resume("other") == 0
+    assert resumed.count == 0
+    assert resumed.failed == set()
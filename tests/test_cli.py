@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+pytest.importorskip("typer")
+
+from typer.testing import CliRunner
+
+from socialcontext import cli, utils
+from socialcontext.standin import score
+
+
+@pytest.fixture
+def runner(client, monkeypatch):
+    monkeypatch.setattr(utils, "_client", client)
+    return CliRunner()
+
+
+def test_classify_input_writes_jsonl_and_resumes(runner, tmp_path):
+    urls = [f"https://example.com/{i}" for i in range(10)]
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("\n".join(urls) + "\n")
+    output_file = tmp_path / "out.jsonl"
+    args = ["classify", "--input", str(input_file), "--output-file", str(output_file), "vice"]
+
+    result = runner.invoke(cli.app, args)
+
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert sorted(r["index"] for r in records) == list(range(10))
+    for record in records:
+        assert record["classifications"] == {"vice": score(record["url"], "vice")}
+
+    result = runner.invoke(cli.app, args)
+
+    assert result.exit_code == 0, result.output
+    assert len(output_file.read_text().splitlines()) == 10
+
+
+def test_classify_input_retries_failures_on_resume(runner, standin, tmp_path):
+    input_file = tmp_path / "urls.txt"
+    input_file.write_text("https://example.com/1\nhttps://example.com/2\n")
+    output_file = tmp_path / "out.jsonl"
+    args = ["classify", "--input", str(input_file), "--output-file", str(output_file), "vice"]
+    utils._client.validate_models = False
+    utils._client.retry.max_retries = 0
+    standin.error_rate = 1.0
+
+    assert runner.invoke(cli.app, args).exit_code == 0
+    standin.error_rate = 0.0
+    assert runner.invoke(cli.app, args).exit_code == 0
+    assert runner.invoke(cli.app, args).exit_code == 0
+
+    records = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert len(records) == 4
+    assert all("error" in r for r in records[:2])
+    latest = {r["index"]: r for r in records}
+    assert sorted(latest) == [0, 1]
+    assert all("error" not in r for r in latest.values())
+
+
+def test_jobs_list_keeps_api_shape(runner, client):
+    for i in range(3):
+        client.create_job(input_file=f"s3://bucket/in-{i}.txt", output_path="s3://bucket/out/", models=["vice"])
+
+    result = runner.invoke(cli.app, ["jobs", "list"])
+
+    assert result.exit_code == 0, result.output
+    assert len(json.loads(result.output)["jobs"]) == 3
+
+    result = runner.invoke(cli.app, ["jobs", "list", "--format", "jsonl"])
+
+    assert result.exit_code == 0, result.output
+    assert len(result.output.splitlines()) == 3
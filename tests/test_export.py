@@ -0,0 +1,39 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from socialcontext.export import ExportFormats, write_columnar
+
+
+def make_part(start, count):
+    lines = ["url,domain,vice,antivax"]
+    for i in range(start, start + count):
+        lines.append(f"https://site{i % 7}.com/{i},site{i % 7}.com,{i / 1000:.3f},0.5")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def read_back(path, fmt):
+    if fmt == ExportFormats.parquet:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(str(path))
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize(
+    "fmt", [ExportFormats.parquet, ExportFormats.arrow, ExportFormats.feather]
+)
+def test_multiple_parts_and_blocks(tmp_path, fmt):
+    parts = [({"Key": f"data-{n}"}, make_part(n * 500, 500)) for n in range(3)]
+    path = tmp_path / f"out.{fmt.value}"
+
+    # A small block size makes every part several CSV blocks.
+    rows = write_columnar(iter(parts), path, fmt, block_size=4096)
+
+    assert rows == 1500
+    table = read_back(path, fmt)
+    assert table.num_rows == 1500
+    assert table.column("url").to_pylist()[:2] == ["https://site0.com/0", "https://site1.com/1"]
+    assert table.column("domain").to_pylist()[1499] == "site1.com"
+    assert table.schema.field("vice").type == pa.float64()
@@ -0,0 +1,50 @@
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from socialcontext.retry import RetryPolicy
+
+
+def response(status, retry_after=None):
+    resp = requests.Response()
+    resp.status_code = status
+    if retry_after is not None:
+        resp.headers["Retry-After"] = retry_after
+    return resp
+
+
+@pytest.mark.parametrize("status", [500, 502, 504])
+def test_post_not_retried_on_server_errors(status):
+    policy = RetryPolicy()
+    assert policy.delay(0, "post", response=response(status)) is None
+    assert policy.delay(0, "get", response=response(status)) is not None
+    assert policy.delay(0, "post", response=response(status), idempotent=True) is not None
+
+
+def test_post_retried_when_not_acted_on():
+    policy = RetryPolicy()
+    assert policy.delay(0, "post", response=response(429)) is not None
+    assert policy.delay(0, "post", response=response(503, "2")) == 2
+    assert policy.delay(0, "post", response=response(503)) is None
+    assert policy.delay(0, "post", error=requests.ConnectTimeout()) is not None
+    assert policy.delay(0, "post", error=requests.ReadTimeout()) is None
+    assert policy.delay(0, "get", error=requests.ReadTimeout()) is not None
+
+
+def test_create_job_sent_once_on_server_error(client, standin):
+    client.retry = RetryPolicy(backoff_factor=0)
+    client.validate_models = False
+    standin.error_rate = 1.0
+    r = client.create_job(input_file="s3://bucket/urls.txt", models=["vice"])
+    assert r.status_code == 500
+    assert standin.counts["errors"] == 1
+    assert not standin.jobs
+
+
+def test_classify_retried_on_server_error(client, standin):
+    client.retry = RetryPolicy(backoff_factor=0, max_retries=2)
+    client.validate_models = False
+    standin.error_rate = 1.0
+    r = client.classify("news", models=["vice"], url="https://example.com/")
+    assert r.status_code == 500
+    assert standin.counts["errors"] == 3
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from socialcontext.fanout import Shard
+from socialcontext.router import MissingResult, join_results
+
+
+def test_join_results_follows_input(s3, tmp_path):
+    s3.put_object(
+        Bucket="bucket",
+        Key="job/output/shard-0000/data-0000.csv",
+        Body=b"url,domain,vice\nhttps://b.com/,b.com,0.25\n",
+    )
+    s3.put_object(
+        Bucket="bucket",
+        Key="job/output/shard-0000/data-0001.csv",
+        Body=b"url,domain,vice\nhttps://a.com/x?id=1,a.com,0.75\n",
+    )
+    shards = [Shard(0, "s3://bucket/job/input/shard-0000.gz", "s3://bucket/job/output/shard-0000/")]
+    urls = [
+        "https://a.com/x?utm_source=feed&id=1",
+        "https://missing.com/",
+        "HTTPS://B.com",
+        "https://a.com/x?id=1",
+    ]
+
+    results = list(join_results(shards, urls, ["vice"], index_path=tmp_path / "index"))
+
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.item for r in results] == urls
+    assert results[0].data["classifications"] == {"vice": 0.75}
+    assert isinstance(results[1].error, MissingResult)
+    assert results[1].data is None
+    assert results[2].data["classifications"] == {"vice": 0.25}
+    assert results[3].data["url"] == "https://a.com/x?id=1"
@@ -0,0 +1,149 @@
+import gzip
+from io import BytesIO
+
+import pytest
+
+from socialcontext.s3 import (
+    download_to_file,
+    list_parts,
+    prefetch_parts,
+    stream_parts,
+    write_parts,
+)
+
+HEADER = b"url,domain,vice\n"
+
+
+def part_body(n):
+    return HEADER + f"https://site.com/{n},site.com,0.{n % 10}\n".encode("utf-8")
+
+
+def put_parts(s3, prefix, numbers, compress=False):
+    for n in numbers:
+        body = part_body(n)
+        key = f"{prefix}data-{n:05}.csv"
+        if compress:
+            body, key = gzip.compress(body), key + ".gz"
+        s3.put_object(Bucket="bucket", Key=key, Body=body)
+
+
+def test_list_parts_pages_past_1000_keys(s3):
+    put_parts(s3, "job/", range(1005))
+    s3.put_object(Bucket="bucket", Key="job/errors-00000.csv", Body=b"url,error\n")
+
+    parts = list_parts("bucket", "job/", "data")
+
+    assert len(parts) == 1005
+    assert [p["Key"] for p in parts] == [f"job/data-{n:05}.csv" for n in range(1005)]
+    assert [p["Key"] for p in list_parts("bucket", "job/", "errors")] == ["job/errors-00000.csv"]
+
+
+def test_prefetch_keeps_part_order(s3):
+    put_parts(s3, "job/", reversed(range(20)), compress=True)
+    parts = list_parts("bucket", "job/", "data")
+
+    fetched = list(prefetch_parts("bucket", parts, workers=4, memory_budget=64))
+
+    assert [part["Key"] for part, _ in fetched] == [p["Key"] for p in parts]
+    assert [data for _, data in fetched] == [part_body(n) for n in range(20)]
+
+
+def test_write_parts_keeps_only_first_header():
+    parts = [({"Key": "a"}, part_body(0)), ({"Key": "b"}, part_body(1)[:-1])]
+    sink = BytesIO()
+
+    written = write_parts(iter(parts), sink)
+
+    assert sink.getvalue() == part_body(0) + part_body(1)[len(HEADER):]
+    assert written == len(sink.getvalue())
+    appended = BytesIO()
+    write_parts(iter(parts), appended, first=False)
+    assert HEADER not in appended.getvalue()
+
+
+def test_download_resumes_with_new_parts(s3, tmp_path):
+    put_parts(s3, "job/", range(3), compress=True)
+    output = tmp_path / "out.csv"
+
+    assert download_to_file("bucket", "job/", output) == 3
+    expected = HEADER + b"".join(part_body(n)[len(HEADER):] for n in range(3))
+    assert output.read_bytes() == expected
+
+    # Nothing changed: nothing is fetched again.
+    assert download_to_file("bucket", "job/", output) == 0
+    assert output.read_bytes() == expected
+
+    # An interrupted download leaves a partly written part behind.
+    with open(output, "ab") as f:
+        f.write(b"https://site.com/partial")
+    put_parts(s3, "job/", range(3, 5), compress=True)
+    assert download_to_file("bucket", "job/", output) == 2
+    expected = HEADER + b"".join(part_body(n)[len(HEADER):] for n in range(5))
+    assert output.read_bytes() == expected
+
+    assert download_to_file("bucket", "job/", output, resume=False) == 5
+    assert output.read_bytes() == expected
+
+
+class TrackedReader(BytesIO):
+    """Counts bytes read ahead of the consumer across all open parts."""
+
+    ahead = 0
+    max_ahead = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        TrackedReader.ahead += len(chunk)
+        TrackedReader.max_ahead = max(TrackedReader.max_ahead, TrackedReader.ahead)
+        return chunk
+
+
+def test_stream_parts_bounds_memory_by_chunks():
+    bodies = {f"data-{n}": bytes([65 + n]) * 10_000 for n in range(6)}
+    TrackedReader.ahead = TrackedReader.max_ahead = 0
+
+    def open_part(bucket, key):
+        return TrackedReader(bodies[key])
+
+    out = []
+    parts = [{"Key": key} for key in bodies]
+    for part, chunks in stream_parts(
+        "bucket", parts, workers=4, memory_budget=2_500, chunk_size=1_000, open_part=open_part
+    ):
+        data = b""
+        for chunk in chunks:
+            TrackedReader.ahead -= len(chunk)
+            data += chunk
+        out.append((part["Key"], data))
+
+    # Each part is larger than the budget, yet is streamed whole.
+    assert out == list(bodies.items())
+    # The budget, plus a chunk in hand per worker and one with the consumer.
+    assert TrackedReader.max_ahead <= 2_500 + 5 * 1_000
+
+
+def test_stream_parts_raises_part_errors():
+    def open_part(bucket, key):
+        if key == "data-1":
+            raise OSError("gone")
+        return BytesIO(b"x")
+
+    streamed = stream_parts("bucket", [{"Key": "data-0"}, {"Key": "data-1"}], open_part=open_part)
+    _, chunks = next(streamed)
+    assert list(chunks) == [b"x"]
+    _, chunks = next(streamed)
+    with pytest.raises(OSError):
+        list(chunks)
+    streamed.close()
+
+
+def test_write_parts_skips_header_split_across_chunks():
+    parts = [
+        ({"Key": "a"}, iter([b"url,do", b"main\nhttps://a.com/,a.com"])),
+        ({"Key": "b"}, iter([b"url,do", b"main", b"\nhttps://b.com/,b.com\n"])),
+    ]
+    sink = BytesIO()
+
+    write_parts(iter(parts), sink)
+
+    assert sink.getvalue() == b"url,domain\nhttps://a.com/,a.com\nhttps://b.com/,b.com\n"
@@ -0,0 +1,65 @@
+from socialcontext import urlindex
+from socialcontext.urlindex import URLIndex
+
+
+def make_part(urls, score="0.5"):
+    lines = ["url,domain,vice"] + [f"{url},{url.split('/')[2]},{score}" for url in urls]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_colliding_hashes_are_probed(tmp_path, monkeypatch):
+    # Two hash values for every URL: all slots collide and chains interleave.
+    monkeypatch.setattr(urlindex, "key_hash", lambda key: 1 + len(key) % 2)
+    urls = [f"https://site.com/{'x' * i}" for i in range(20)]
+
+    with URLIndex(tmp_path / "index") as index:
+        assert index.add_part({"Key": "data-0", "ETag": "a"}, make_part(urls)) == 20
+
+        assert len(index) == 20
+        for url in urls:
+            assert index.lookup(url)["url"] == url
+        assert index.lookup("https://site.com/missing") is None
+        assert index.lookup("https://site.com/missin") is None
+
+
+def test_table_grows_and_rehashes(tmp_path, monkeypatch):
+    monkeypatch.setattr(urlindex, "INITIAL_CAPACITY", 8)
+    urls = [f"https://site{i % 7}.com/{i}" for i in range(100)]
+
+    with URLIndex(tmp_path / "index") as index:
+        index.add_part({"Key": "data-0", "ETag": "a"}, make_part(urls))
+
+        assert index.capacity >= 100 / urlindex.MAX_LOAD
+        assert len(index) == 100
+        for url in urls:
+            assert index.lookup(url)["url"] == url
+
+    with URLIndex(tmp_path / "index") as index:
+        assert index.capacity >= 100 / urlindex.MAX_LOAD
+        assert all(index.lookup(url) is not None for url in urls)
+
+
+def test_add_part_to_reopened_index(tmp_path):
+    first = [f"https://a.com/{i}" for i in range(10)]
+    second = [f"https://b.com/{i}" for i in range(10)] + first[:5]
+    with URLIndex(tmp_path / "index") as index:
+        index.add_part({"Key": "data-0", "ETag": "a"}, make_part(first, "0.1"))
+
+    with URLIndex(tmp_path / "index") as index:
+        assert index.has_part({"Key": "data-0", "ETag": "a"})
+        assert not index.has_part({"Key": "data-0", "ETag": "changed"})
+        index.add_part({"Key": "data-1", "ETag": "b"}, make_part(second, "0.9"))
+
+        assert len(index) == 20
+        # URLs indexed again point to their latest row.
+        assert index.lookup(first[0])["classifications"] == {"vice": 0.9}
+        assert index.lookup(first[9])["classifications"] == {"vice": 0.1}
+        assert index.lookup(second[0])["domain"] == "b.com"
+
+
+def test_missing_urls(tmp_path):
+    with URLIndex(tmp_path / "index") as index:
+        assert index.lookup("https://a.com/1") is None
+        index.add_part({"Key": "data-0", "ETag": "a"}, make_part(["https://a.com/1"]))
+
+        assert index.lookup_many(["https://a.com/1", "https://a.com/2"])["https://a.com/2"] is None